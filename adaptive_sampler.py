@@ -0,0 +1,82 @@
+import math
+from reeds_shepp import Steering
+from params import ARENA_WIDTH, ARENA_HEIGHT, MIN_RADIUS
+from collision_index import BOUNDARY_PADDING, pillar_box
+from kinematics import turning_center, advance
+from swept import BOUND_DISC, disc_centre
+
+class AdaptiveSampler:
+    """
+    Path checker whose step length follows the clearance around the robot,
+    like sphere tracing: while the disc around the footprint is clear of every
+    pillar zone and the arena limits by c cm, the robot can move until the disc
+    has travelled c without any check. Open space is crossed in a few large
+    steps, and steps shrink to min_step once the disc touches an obstacle, where
+    the exact footprint test of collision_fn takes over.
+
+    trace returns the number of samples a path took, so min_step can be
+    tuned. Nothing is written to the sampler while checking, so a Robot can
+    share one between threads.
+    """
+    def __init__(self, pillars, collision_fn, occupancy_grid=None, min_step=1.0, r=MIN_RADIUS):
+        self.boxes = [pillar_box(pillar) for pillar in pillars]
+        self.collision_fn = collision_fn
+        self.occupancy_grid = occupancy_grid # Use its distance field if given
+        self.min_step = min_step
+        self.r = r
+
+    def clearance(self, px, py):
+        """ Distance from (px, py) to the nearest pillar zone or arena limit. """
+        if self.occupancy_grid is not None:
+            return self.occupancy_grid.clearance(px, py)
+        d = min(px + BOUNDARY_PADDING, ARENA_WIDTH + BOUNDARY_PADDING - px,
+                py + BOUNDARY_PADDING, ARENA_HEIGHT + BOUNDARY_PADDING - py)
+        for x_min, y_min, x_max, y_max in self.boxes:
+            dx = max(x_min - px, 0, px - x_max)
+            dy = max(y_min - py, 0, py - y_max)
+            d = min(d, math.hypot(dx, dy))
+        return d
+
+    def disc_clearance(self, x, y, degrees):
+        (offset,), radius = BOUND_DISC
+        cx, cy = disc_centre(x, y, degrees, offset)
+        return self.clearance(cx, cy) - radius
+
+    def check_path(self, path, start_x, start_y, start_degrees):
+        """
+        Same contract as Robot.simulate_reeds_shepps_path: returns
+        (True, None, None, None) on collision, otherwise
+        (False, end_x, end_y, end_degrees).
+        """
+        return self.trace(path, start_x, start_y, start_degrees)[:4]
+
+    def trace(self, path, start_x, start_y, start_degrees):
+        """ Like check_path, with the number of samples taken appended to the result. """
+        samples = 0
+        x, y, degrees = start_x, start_y, start_degrees
+        (offset,), _ = BOUND_DISC
+
+        for e in path:
+            # How far the disc centre moves per cm driven along this segment
+            if e.steering == Steering.STRAIGHT:
+                rate = 1.0
+            else:
+                cx, cy = turning_center(x, y, degrees, e.steering, self.r)
+                dx, dy = disc_centre(x, y, degrees, offset)
+                rate = max(math.hypot(dx - cx, dy - cy) / self.r, 1e-6)
+
+            s = 0.0
+            clear = self.disc_clearance(x, y, degrees)
+            while s < e.param:
+                step = max(self.min_step, clear / rate)
+                s = min(s + step, e.param)
+
+                px, py, pd = advance(x, y, degrees, e.steering, e.gear, s, self.r)
+                samples += 1
+                clear = self.disc_clearance(px, py, pd)
+                if clear <= 0 and self.collision_fn(px, py, pd):
+                    return True, None, None, None, samples
+
+            x, y, degrees = advance(x, y, degrees, e.steering, e.gear, e.param, self.r)
+
+        return False, x, y, degrees, samples
@@ -1,9 +1,9 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 from params import ARENA_WIDTH, ARENA_HEIGHT, CELL_SIZE
 
 def draw_arena_boundary():
     """Draw the actual boundary of the arena."""
+    import matplotlib.pyplot as plt
+    from matplotlib import patches
     boundary = patches.Rectangle((0, 0), ARENA_WIDTH, ARENA_HEIGHT, 
                                  fill=False, edgecolor='black', linewidth=2)
     plt.gca().add_patch(boundary)
@@ -0,0 +1,247 @@
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tracemalloc
+import reeds_shepp as rs
+from pillars import get_pillars
+from robot import Robot
+from legs import LegMatrix
+from tour import solve_tour
+from collision_index import OccupancyGrid
+from validation import PillarObstacles
+from utils import percentile
+from instrumentation import instrumented
+from params import ARENA_WIDTH, ARENA_HEIGHT, CELL_SIZE, PILLAR_INFLATION
+
+START = (20, 20, 0) # Robot start pose, as in shortest_path.main
+CARD_DIRS = ['N', 'S', 'E', 'W', 'X']
+STAGES = ['waypoints', 'legs', 'rs_solve', 'collision', 'tour', 'total']
+
+def tour_exists(cost):
+    """
+    Whether the cost matrix admits an open tour from node 0 through every
+    other node: Held-Karp over bitsets of reachable end nodes, no lengths.
+    """
+    n = len(cost) - 1
+    if n <= 0:
+        return True
+    successors = [sum(1 << k for k in range(n) if k != j and cost[j + 1][k + 1] != math.inf) for j in range(n)]
+    reach = [0] * (1 << n) # reach[mask]: waypoints a path through exactly mask can end at
+    for j in range(n):
+        if cost[0][j + 1] != math.inf:
+            reach[1 << j] = 1 << j
+
+    for mask in range(1, 1 << n):
+        ends = reach[mask]
+        j = 0
+        while ends:
+            if ends & 1:
+                onwards = successors[j] & ~mask
+                while onwards:
+                    bit = onwards & -onwards
+                    reach[mask | bit] |= bit
+                    onwards ^= bit
+            ends >>= 1
+            j += 1
+    return reach[-1] != 0
+
+def random_arena(seed, min_pillars=2, max_pillars=12):
+    """
+    Return pillar_data for a reproducible random layout: between min_pillars
+    and max_pillars cell-aligned pillars inside the arena, with every card_dir,
+    no overlapping collision zones, none on the start pose and a
+    collision-free tour through every waypoint.
+
+    Pillars are added one at a time and a candidate is dropped when no tour
+    would exist with it, so every layout is feasible. Dense layouts may end
+    up with fewer pillars than drawn if no feasible spot is found.
+    """
+    rng = random.Random(seed)
+    count = rng.randint(min_pillars, max_pillars)
+    spacing = 10 + 2 * PILLAR_INFLATION
+    pillar_data = []
+
+    for _ in range(100 * count):
+        if len(pillar_data) == count:
+            break
+        x = rng.randrange(0, ARENA_WIDTH - 10 + 1, CELL_SIZE)
+        y = rng.randrange(0, ARENA_HEIGHT - 10 + 1, CELL_SIZE)
+        if x < 60 and y < 60: # Keep clear of the start pose
+            continue
+        if any(abs(x - px) < spacing and abs(y - py) < spacing for px, py, _ in pillar_data):
+            continue
+        candidate = pillar_data + [(x, y, rng.choice(CARD_DIRS))]
+        pillars = get_pillars(candidate)
+        obstacles = PillarObstacles(pillars)
+        waypoints = [pillar.getWaypoint() for pillar in pillars if pillar.card_dir != 'X']
+        # Cheap test first: no waypoint may be in collision itself
+        if any(obstacles.footprint_blocked(*waypoint) for waypoint in waypoints):
+            continue
+        if not tour_exists(LegMatrix(Robot(*START, pillars), [START] + waypoints).costs):
+            continue
+        pillar_data = candidate
+
+    return pillar_data
+
+def plan(pillar_data, checker='sampled', collision_index=False, method='held_karp'):
+    """
+    Run the planning pipeline of planner.find_best_tour on one arena, timing
+    each stage separately. Returns (timings, result) where timings maps stage
+    name to seconds.
+
+    Legs are solved with LegMatrix.solve_leg, as the planner does; the
+    Reeds-Shepp solves and path simulations inside it are told apart with
+    the instrumentation timers of those two stages only.
+    """
+    timings = {}
+    rs.path_cache.clear() # Every run pays for its own solves
+    pillars = get_pillars(pillar_data)
+    index = OccupancyGrid(pillars) if collision_index else None
+    robot = Robot(START[0], START[1], START[2], pillars, collision_index=index, checker=checker)
+    total = time.perf_counter()
+
+    t = time.perf_counter()
+    waypoints = [pillar.getWaypoint() for pillar in pillars if pillar.card_dir != 'X']
+    timings['waypoints'] = time.perf_counter() - t
+
+    legs = LegMatrix(robot, [START] + waypoints, solve=False)
+    n = len(legs.nodes)
+    pairs = [(i, j) for i in range(n) for j in range(1, n) if i != j]
+
+    with instrumented(stages=('rs_solve', 'simulate')) as session:
+        t = time.perf_counter()
+        for i, j in pairs:
+            legs.solve_leg(i, j)
+        timings['legs'] = time.perf_counter() - t
+    timings['rs_solve'] = session.timer('rs_solve')[1]
+    timings['collision'] = session.timer('simulate')[1]
+
+    t = time.perf_counter()
+    length, order = solve_tour(legs.costs, method)
+    timings['tour'] = time.perf_counter() - t
+
+    timings['total'] = time.perf_counter() - total
+    result = {
+        'pillars': len(pillars),
+        'waypoints': len(waypoints),
+        'legs': len(pairs),
+        'simulated': session.calls('simulate'),
+        'length': None if order is None else round(length, 3),
+    }
+    return timings, result
+
+def peak_memory(pillar_data, **options):
+    """ Peak bytes allocated while planning one arena. """
+    tracemalloc.start()
+    try:
+        plan(pillar_data, **options)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run(seeds, repeat=3, min_pillars=2, max_pillars=12, **options):
+    """
+    Plan every seeded arena repeat times and return the report as a dict:
+    p50/p95 latency per stage in ms, throughput and peak memory.
+    """
+    samples = {stage: [] for stage in STAGES}
+    arenas = []
+    legs = 0
+
+    layouts = {seed: random_arena(seed, min_pillars, max_pillars) for seed in seeds}
+    wall = time.perf_counter() # Generating the arenas is not part of the workload
+
+    for seed, pillar_data in layouts.items():
+        for _ in range(repeat):
+            timings, result = plan(pillar_data, **options)
+            for stage in STAGES:
+                samples[stage].append(timings[stage])
+            legs += result['legs']
+        result['seed'] = seed
+        arenas.append(result)
+
+    wall = time.perf_counter() - wall
+    runs = len(samples['total'])
+
+    # Measured apart from the timings, tracemalloc slows allocation down
+    peak = max(peak_memory(pillar_data, **options) for pillar_data in layouts.values())
+
+    return {
+        'options': dict(options, repeat=repeat, min_pillars=min_pillars, max_pillars=max_pillars),
+        'stages': {stage: {'p50_ms': round(percentile(samples[stage], 50) * 1000, 3),
+                           'p95_ms': round(percentile(samples[stage], 95) * 1000, 3)}
+                   for stage in STAGES},
+        'throughput': {'arenas_per_s': round(runs / wall, 3),
+                       'legs_per_s': round(legs / wall, 3)},
+        'peak_memory_bytes': peak,
+        'arenas': arenas,
+    }
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Return a list of regression messages: stages whose p50 or p95 latency is
+    more than tolerance slower than in baseline, or arenas whose tour length
+    changed.
+    """
+    regressions = []
+    for stage, stats in report['stages'].items():
+        old = baseline['stages'].get(stage)
+        if old is None:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            # Ignore noise on stages that take next to no time
+            if old[key] > 0.05 and stats[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{stage} {key}: {old[key]} -> {stats[key]}")
+
+    old_lengths = {arena['seed']: arena['length'] for arena in baseline.get('arenas', [])}
+    for arena in report['arenas']:
+        if arena['seed'] in old_lengths and old_lengths[arena['seed']] != arena['length']:
+            regressions.append(f"seed {arena['seed']} tour length: {old_lengths[arena['seed']]} -> {arena['length']}")
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tour planner on seeded random arenas.")
+    parser.add_argument('--seeds', type=int, default=20, help="number of arenas, seeded 0..N-1")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per arena")
+    parser.add_argument('--min-pillars', type=int, default=2)
+    parser.add_argument('--max-pillars', type=int, default=12)
+    parser.add_argument('--checker', choices=['sampled', 'swept', 'adaptive'], default='sampled')
+    parser.add_argument('--collision-index', action='store_true', help="check collisions with an OccupancyGrid")
+    parser.add_argument('--method', choices=['held_karp', 'branch_and_bound'], default='held_karp')
+    parser.add_argument('--output', help="write the JSON report to this file")
+    parser.add_argument('--baseline', help="compare against this JSON report, exit 1 on regressions")
+    parser.add_argument('--save-baseline', help="also write the report to this file as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before a regression, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    report = run(range(args.seeds), args.repeat, args.min_pillars, args.max_pillars,
+                 checker=args.checker, collision_index=args.collision_index, method=args.method)
+    text = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print("Regression:", regression, file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
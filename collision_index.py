@@ -0,0 +1,132 @@
+import math
+from array import array
+from params import ARENA_WIDTH, ARENA_HEIGHT, ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT
+
+# How far the footprint may stick out of the arena, see Robot.collision_detected
+BOUNDARY_PADDING = 10
+
+# Points checked by Robot.collision_detected, relative to the robot's (x, y) at
+# 0 degrees: the 4 footprint corners followed by the 4 edge midpoints
+FOOTPRINT_OFFSETS = [
+    (0, 0),
+    (ROBOT_FOOTPRINT_WIDTH, 0),
+    (ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT),
+    (0, ROBOT_FOOTPRINT_HEIGHT),
+    (ROBOT_FOOTPRINT_WIDTH / 2, 0),
+    (ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT / 2),
+    (ROBOT_FOOTPRINT_WIDTH / 2, ROBOT_FOOTPRINT_HEIGHT),
+    (0, ROBOT_FOOTPRINT_HEIGHT / 2),
+]
+
+def footprint_points(x, y, degrees):
+    """
+    Return the points of the robot footprint checked for collisions when the
+    robot is at (x, y, degrees), rotated around (x, y).
+    """
+    theta = math.radians(degrees)
+    c = math.cos(theta)
+    s = math.sin(theta)
+    return [(x + ox * c - oy * s, y + ox * s + oy * c) for ox, oy in FOOTPRINT_OFFSETS]
+
+def pillar_box(pillar):
+    """ Return (x_min, y_min, x_max, y_max) of a pillar's inflated collision zone. """
+    return (pillar.x - pillar.PADDING, pillar.y - pillar.PADDING,
+            pillar.x + pillar.PADDING + 10, pillar.y + pillar.PADDING + 10)
+
+class OccupancyGrid:
+    """
+    Rasterised collision zones of the pillars in an arena, built once so that
+    a footprint check is 8 bitmap lookups whatever the number of pillars.
+
+    A cell is occupied if it overlaps any pillar's inflated collision zone, so
+    the grid is conservative by at most one cell (resolution cm) at the zone
+    edges. The arena boundary is checked exactly.
+    """
+    def __init__(self, pillars, resolution=0.5, distance_resolution=2):
+        self.pillars = list(pillars)
+        self.resolution = resolution
+        self.x0 = -BOUNDARY_PADDING
+        self.y0 = -BOUNDARY_PADDING
+        self.x1 = ARENA_WIDTH + BOUNDARY_PADDING
+        self.y1 = ARENA_HEIGHT + BOUNDARY_PADDING
+        self.width = int(math.ceil((self.x1 - self.x0) / resolution)) + 1
+        self.height = int(math.ceil((self.y1 - self.y0) / resolution)) + 1
+        self.cells = bytearray(self.width * self.height)
+
+        for pillar in self.pillars:
+            self.fill_box(pillar_box(pillar))
+
+        # Distance field, built on the first clearance query
+        self.distance_resolution = distance_resolution
+        self.distances = None
+
+    def fill_box(self, box, value=1):
+        """ Mark every cell overlapping the open box (x_min, y_min, x_max, y_max). """
+        res = self.resolution
+        x_min, y_min, x_max, y_max = box
+        i0 = max(0, int(math.floor((x_min - self.x0) / res)))
+        i1 = min(self.width, int(math.ceil((x_max - self.x0) / res)))
+        j0 = max(0, int(math.floor((y_min - self.y0) / res)))
+        j1 = min(self.height, int(math.ceil((y_max - self.y0) / res)))
+        if i0 >= i1:
+            return
+        row = bytes([value]) * (i1 - i0)
+        for j in range(j0, j1):
+            start = j * self.width + i0
+            self.cells[start:start + i1 - i0] = row
+
+    def point_blocked(self, px, py):
+        """ Whether a footprint point at (px, py) is out of bounds or in a pillar's zone. """
+        if px < self.x0 or px > self.x1 or py < self.y0 or py > self.y1:
+            return True
+        i = int((px - self.x0) / self.resolution)
+        j = int((py - self.y0) / self.resolution)
+        return self.cells[j * self.width + i] != 0
+
+    def footprint_blocked(self, x, y, degrees):
+        """ Drop-in replacement for Robot.collision_detected. """
+        for px, py in footprint_points(x, y, degrees):
+            if self.point_blocked(px, py):
+                return True
+        return False
+
+    def build_distance_field(self):
+        """
+        Precompute the Euclidean distance from each distance_resolution cell
+        centre to the nearest pillar collision zone or arena limit.
+        """
+        res = self.distance_resolution
+        width = int(math.ceil((self.x1 - self.x0) / res))
+        height = int(math.ceil((self.y1 - self.y0) / res))
+        boxes = [pillar_box(pillar) for pillar in self.pillars]
+        distances = array('f', bytes(4 * width * height))
+
+        for j in range(height):
+            cy = self.y0 + (j + 0.5) * res
+            for i in range(width):
+                cx = self.x0 + (i + 0.5) * res
+                d = min(cx - self.x0, self.x1 - cx, cy - self.y0, self.y1 - cy)
+                for x_min, y_min, x_max, y_max in boxes:
+                    dx = max(x_min - cx, 0, cx - x_max)
+                    dy = max(y_min - cy, 0, cy - y_max)
+                    d = min(d, math.hypot(dx, dy))
+                distances[j * width + i] = d
+
+        self.distance_width = width
+        self.distance_height = height
+        self.distances = distances
+
+    def clearance(self, px, py):
+        """
+        Lower bound on the distance from (px, py) to the nearest pillar
+        collision zone or arena limit, 0 if the point is blocked.
+        """
+        if self.distances is None:
+            self.build_distance_field()
+        res = self.distance_resolution
+        if px < self.x0 or px >= self.x1 or py < self.y0 or py >= self.y1:
+            return 0.0
+        i = min(int((px - self.x0) / res), self.distance_width - 1)
+        j = min(int((py - self.y0) / res), self.distance_height - 1)
+        # The field is sampled at cell centres, so subtract half a cell diagonal
+        return max(0.0, self.distances[j * self.distance_width + i] - res * 0.7072)
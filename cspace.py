@@ -0,0 +1,273 @@
+import os
+import sys
+import math
+import random
+import hashlib
+import argparse
+from params import ARENA_WIDTH, ARENA_HEIGHT, ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT
+from collision_index import BOUNDARY_PADDING, FOOTPRINT_OFFSETS, pillar_box
+
+def layout_key(pillars, xy_resolution, theta_resolution):
+    """
+    Return a hash identifying a C-space table: the obstacle layout, the
+    table resolution and the footprint/arena parameters it was built with.
+    """
+    boxes = sorted(pillar_box(pillar) for pillar in pillars)
+    desc = repr((boxes, xy_resolution, theta_resolution, ARENA_WIDTH, ARENA_HEIGHT,
+                 BOUNDARY_PADDING, FOOTPRINT_OFFSETS, 'conservative'))
+    return hashlib.sha1(desc.encode()).hexdigest()
+
+def arc_bounds(ox, oy, lo, hi):
+    """
+    Return (x_min, x_max, y_min, y_max) of the offset (ox, oy) rotated by every
+    angle between lo and hi degrees.
+    """
+    radius = math.hypot(ox, oy)
+    start = math.degrees(math.atan2(oy, ox))
+    angles = [start + lo, start + hi]
+    # The extremes of a circular arc are at its ends or where it crosses an axis
+    quarter = math.ceil((start + lo) / 90)
+    while quarter * 90 <= start + hi:
+        angles.append(quarter * 90)
+        quarter += 1
+    xs = [radius * math.cos(math.radians(a)) for a in angles]
+    ys = [radius * math.sin(math.radians(a)) for a in angles]
+    return min(xs), max(xs), min(ys), max(ys)
+
+class CSpaceTable:
+    """
+    Precomputed configuration-space occupancy over (x, y, heading), packed one
+    bit per pose, so that "is the robot in collision at (x, y, degrees)?" is a
+    single index into the table.
+
+    Poses are sampled every xy_resolution cm and theta_resolution degrees, and
+    queries snap to the nearest sample. The table is conservative: a sample is
+    blocked when Robot.collision_detected would report a collision for any
+    pose that snaps to it, i.e. within half a cell and half a heading step.
+    For each heading slab, each footprint point's reach over that heading
+    range sweeps the pillar zones into a rectangle of blocked (x, y), so
+    building a slab costs a few row fills per pillar.
+    """
+    def __init__(self, pillars, xy_resolution=1, theta_resolution=5, build=True):
+        self.pillars = list(pillars)
+        self.xy_resolution = xy_resolution
+        self.theta_resolution = theta_resolution
+
+        # The footprint can reach this far from (x, y) in any heading. The
+        # origin is a multiple of the resolution so samples sit on round values.
+        reach = math.hypot(ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT)
+        self.x0 = math.floor((-BOUNDARY_PADDING - reach) / xy_resolution) * xy_resolution
+        self.y0 = math.floor((-BOUNDARY_PADDING - reach) / xy_resolution) * xy_resolution
+        self.nx = int(math.ceil((ARENA_WIDTH + 2 * (BOUNDARY_PADDING + reach)) / xy_resolution)) + 1
+        self.ny = int(math.ceil((ARENA_HEIGHT + 2 * (BOUNDARY_PADDING + reach)) / xy_resolution)) + 1
+        self.ntheta = int(round(360 / theta_resolution))
+        self.row_bytes = (self.nx + 7) // 8
+        self.slab_bytes = self.row_bytes * self.ny
+        self.bits = bytearray(self.slab_bytes * self.ntheta)
+
+        # Bounds (x_lo, x_hi, y_lo, y_hi) of each footprint point's offset over
+        # the headings that snap to each slab, widened by half a cell for the
+        # positions that snap to a sample
+        half = xy_resolution / 2
+        self.bounds = []
+        for t in range(self.ntheta):
+            lo, hi = (t - 0.5) * theta_resolution, (t + 0.5) * theta_resolution
+            slab = []
+            for ox, oy in FOOTPRINT_OFFSETS:
+                x_lo, x_hi, y_lo, y_hi = arc_bounds(ox, oy, lo, hi)
+                slab.append((x_lo - half, x_hi + half, y_lo - half, y_hi + half))
+            self.bounds.append(slab)
+
+        if build:
+            for t in range(self.ntheta):
+                self.fill_slab(t)
+
+    @classmethod
+    def load_or_build(cls, pillars, cache_dir, xy_resolution=1, theta_resolution=5):
+        """
+        Return the table for this obstacle layout from cache_dir if it has been
+        built before, otherwise build it and save it there.
+        """
+        path = os.path.join(cache_dir, f"cspace_{layout_key(pillars, xy_resolution, theta_resolution)}.bin")
+        if os.path.exists(path):
+            table = cls(pillars, xy_resolution, theta_resolution, build=False)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) == len(table.bits):
+                table.bits[:] = data
+                return table
+
+        table = cls(pillars, xy_resolution, theta_resolution)
+        table.save(path)
+        return table
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    def key(self):
+        return layout_key(self.pillars, self.xy_resolution, self.theta_resolution)
+
+    def index(self, x, y, degrees):
+        """ Return (t, j, i) of the sample nearest to the pose, or None if it is off the table. """
+        i = int(round((x - self.x0) / self.xy_resolution))
+        j = int(round((y - self.y0) / self.xy_resolution))
+        if i < 0 or i >= self.nx or j < 0 or j >= self.ny:
+            return None
+        t = int(round((degrees % 360) / self.theta_resolution)) % self.ntheta
+        return t, j, i
+
+    def footprint_blocked(self, x, y, degrees):
+        """ Drop-in replacement for Robot.collision_detected. """
+        idx = self.index(x, y, degrees)
+        if idx is None:
+            return True
+        t, j, i = idx
+        return (self.bits[t * self.slab_bytes + j * self.row_bytes + (i >> 3)] >> (i & 7)) & 1 == 1
+
+    def set_row(self, t, j, i0, i1, value):
+        """ Set bits [i0, i1) of row j in heading slab t to value. """
+        i0 = max(i0, 0)
+        i1 = min(i1, self.nx)
+        if i0 >= i1:
+            return
+        offset = t * self.slab_bytes + j * self.row_bytes
+        bits = self.bits
+
+        # Leading partial byte, whole bytes, then trailing partial byte
+        while i0 < i1 and i0 & 7:
+            self._set_bit(offset, i0, value)
+            i0 += 1
+        full = (i1 - i0) >> 3
+        if full:
+            start = offset + (i0 >> 3)
+            bits[start:start + full] = (b'\xff' if value else b'\x00') * full
+            i0 += full * 8
+        while i0 < i1:
+            self._set_bit(offset, i0, value)
+            i0 += 1
+
+    def _set_bit(self, offset, i, value):
+        if value:
+            self.bits[offset + (i >> 3)] |= 1 << (i & 7)
+        else:
+            self.bits[offset + (i >> 3)] &= ~(1 << (i & 7)) & 0xff
+
+    def _open_range(self, lo, hi, origin):
+        """ Sample indices strictly inside (lo, hi). """
+        res = self.xy_resolution
+        return int(math.floor((lo - origin) / res)) + 1, int(math.ceil((hi - origin) / res))
+
+    def _closed_range(self, lo, hi, origin):
+        """ Sample indices inside [lo, hi]. """
+        res = self.xy_resolution
+        return int(math.ceil((lo - origin) / res - 1e-9)), int(math.floor((hi - origin) / res + 1e-9)) + 1
+
+    def pillar_rects(self, t, pillar):
+        """
+        Return the sample rectangles (i0, i1, j0, j1) of samples in slab t for
+        which a footprint point of a pose snapping to them can fall in the
+        pillar's collision zone.
+        """
+        x_min, y_min, x_max, y_max = pillar_box(pillar)
+        rects = []
+        for x_lo, x_hi, y_lo, y_hi in self.bounds[t]:
+            i0, i1 = self._open_range(x_min - x_hi - 1e-9, x_max - x_lo + 1e-9, self.x0)
+            j0, j1 = self._open_range(y_min - y_hi - 1e-9, y_max - y_lo + 1e-9, self.y0)
+            rects.append((i0, i1, j0, j1))
+        return rects
+
+    def fill_slab(self, t, region=None):
+        """
+        Rebuild heading slab t, or only the sample rectangle region
+        (i0, i1, j0, j1) of it, from the arena boundary and the pillars.
+        """
+        if region is None:
+            region = (0, self.nx, 0, self.ny)
+        ri0, ri1, rj0, rj1 = region
+        ri0, ri1 = max(ri0, 0), min(ri1, self.nx)
+        rj0, rj1 = max(rj0, 0), min(rj1, self.ny)
+
+        # Samples whose footprint points all stay within the padded arena
+        bounds = self.bounds[t]
+        x_lo, x_hi = min(b[0] for b in bounds), max(b[1] for b in bounds)
+        y_lo, y_hi = min(b[2] for b in bounds), max(b[3] for b in bounds)
+        fi0, fi1 = self._closed_range(-BOUNDARY_PADDING - x_lo, ARENA_WIDTH + BOUNDARY_PADDING - x_hi, self.x0)
+        fj0, fj1 = self._closed_range(-BOUNDARY_PADDING - y_lo, ARENA_HEIGHT + BOUNDARY_PADDING - y_hi, self.y0)
+
+        for j in range(rj0, rj1):
+            if fj0 <= j < fj1:
+                self.set_row(t, j, ri0, ri1, 1)
+                self.set_row(t, j, max(ri0, fi0), min(ri1, fi1), 0)
+            else:
+                self.set_row(t, j, ri0, ri1, 1)
+
+        for pillar in self.pillars:
+            self._fill_rects(t, self.pillar_rects(t, pillar), region)
+
+    def _fill_rects(self, t, rects, region):
+        ri0, ri1, rj0, rj1 = region
+        for i0, i1, j0, j1 in rects:
+            i0, i1 = max(i0, ri0), min(i1, ri1)
+            for j in range(max(j0, rj0), min(j1, rj1)):
+                self.set_row(t, j, i0, i1, 1)
+
+    def add_pillar(self, pillar):
+        """ Add a pillar, only touching the samples its collision zone affects. """
+        self.pillars.append(pillar)
+        for t in range(self.ntheta):
+            self._fill_rects(t, self.pillar_rects(t, pillar), (0, self.nx, 0, self.ny))
+
+    def remove_pillar(self, pillar):
+        """ Remove a pillar and rebuild only the slab region it used to block. """
+        self.pillars.remove(pillar)
+        for t in range(self.ntheta):
+            rects = self.pillar_rects(t, pillar)
+            region = (min(r[0] for r in rects), max(r[1] for r in rects),
+                      min(r[2] for r in rects), max(r[3] for r in rects))
+            self.fill_slab(t, region)
+
+def check(table, samples=20000, seed=0):
+    """
+    Compare lookups against the exact PillarObstacles test on random poses
+    that are off the sample grid. Returns the false negatives (colliding poses
+    the table reports free, which must be 0) and false positives, as a dict.
+    """
+    from validation import PillarObstacles
+    exact = PillarObstacles(table.pillars)
+    rng = random.Random(seed)
+    false_negatives = false_positives = 0
+    for _ in range(samples):
+        pose = (rng.uniform(-BOUNDARY_PADDING, ARENA_WIDTH + BOUNDARY_PADDING),
+                rng.uniform(-BOUNDARY_PADDING, ARENA_HEIGHT + BOUNDARY_PADDING),
+                rng.uniform(0, 360))
+        blocked = table.footprint_blocked(*pose)
+        colliding = exact.footprint_blocked(*pose)
+        false_negatives += colliding and not blocked
+        false_positives += blocked and not colliding
+    return {'samples': samples, 'false_negatives': false_negatives, 'false_positives': false_positives}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check C-space tables against the exact footprint test.")
+    parser.add_argument('--arenas', type=int, default=5, help="random arenas to check")
+    parser.add_argument('--samples', type=int, default=20000, help="random poses per arena")
+    parser.add_argument('--xy-resolution', type=float, default=1, help="cm between samples")
+    parser.add_argument('--theta-resolution', type=float, default=5, help="degrees between samples")
+    args = parser.parse_args(argv)
+
+    from benchmark import random_arena
+    from pillars import get_pillars
+    failed = False
+    for seed in range(args.arenas):
+        table = CSpaceTable(get_pillars(random_arena(seed)), args.xy_resolution, args.theta_resolution)
+        report = check(table, args.samples, seed)
+        print(f"Arena {seed}: {report['false_negatives']} false negatives, "
+              f"{report['false_positives']} false positives in {report['samples']} poses")
+        failed = failed or report['false_negatives'] > 0
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
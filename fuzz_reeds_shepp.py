@@ -0,0 +1,249 @@
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import reeds_shepp as rs
+from kinematics import advance
+from packed_path import PackedPath
+from params import ARENA_WIDTH, MIN_RADIUS
+
+# (name, transform of the relative pose, gear sign, steering sign) for the
+# four variants of each family, in the order reeds_shepp tries them
+VARIANTS = [
+    ('original', lambda x, y, theta: (x, y, theta), 1, 1),
+    ('timeflip', lambda x, y, theta: (-x, y, -theta), -1, 1),
+    ('reflect', lambda x, y, theta: (x, -y, -theta), 1, -1),
+    ('reflect_timeflip', lambda x, y, theta: (-x, -y, theta), -1, -1),
+]
+
+PATH_FNS = [rs.path1, rs.path2, rs.path3, rs.path4, rs.path5, rs.path6,
+            rs.path7, rs.path8, rs.path9, rs.path10, rs.path11, rs.path12]
+
+def sample_poses(n, seed=0, extent=ARENA_WIDTH, r=MIN_RADIUS, edge_fraction=0.2):
+    """
+    Yield n reproducible relative poses (x, y, theta in degrees) within
+    extent of the origin. edge_fraction of them are picked near the places
+    the closed-form formulas are fragile: headings on the 90 degree grid the
+    arena uses, poses almost on top of the origin, and distances close to
+    the 2r, 4r and 6r circle-tangency limits.
+    """
+    rng = random.Random(seed)
+    for _ in range(n):
+        if rng.random() >= edge_fraction:
+            yield (rng.uniform(-extent, extent), rng.uniform(-extent, extent), rng.uniform(0, 360))
+            continue
+
+        kind = rng.randrange(3)
+        if kind == 0:
+            yield (rng.uniform(-extent, extent), rng.uniform(-extent, extent), 90 * rng.randrange(4))
+        elif kind == 1:
+            yield (rng.uniform(-1e-3, 1e-3), rng.uniform(-1e-3, 1e-3), rng.choice([0, rng.uniform(0, 360)]))
+        else:
+            distance = rng.choice([2, 4, 6]) * r * (1 + rng.uniform(-1e-6, 1e-6))
+            angle = rng.uniform(0, 2 * math.pi)
+            yield (distance * math.cos(angle), distance * math.sin(angle), rng.choice([0, 90, 180, 270, rng.uniform(0, 360)]))
+
+def integrate(path, r=MIN_RADIUS):
+    """ Pose reached by driving path (PackedPath or list of PathElement) from (0, 0, 0). """
+    x, y, degrees = 0.0, 0.0, 0.0
+    if isinstance(path, PackedPath):
+        segments = path.segments()
+    else:
+        segments = ((e.param, e.steering, e.gear) for e in path)
+    for param, steering, gear in segments:
+        x, y, degrees = advance(x, y, degrees, steering, gear, param, r)
+    return x, y, degrees
+
+def pose_error(path, target, r=MIN_RADIUS):
+    """
+    Return (position_error, heading_error) between the end of path and
+    target, in cm and degrees. NaN lengths give infinite errors.
+    """
+    x, y, degrees = integrate(path, r)
+    position = math.hypot(x - target[0], y - target[1])
+    heading = abs((degrees - target[2] + 180) % 360 - 180)
+    if math.isnan(position) or math.isnan(heading):
+        return math.inf, math.inf
+    return position, heading
+
+class FamilyStats:
+    """ Counters for one family/variant. """
+    __slots__ = ('calls', 'valid', 'failures', 'errors', 'seconds', 'max_position', 'max_heading', 'worst')
+
+    def __init__(self):
+        self.calls = 0
+        self.valid = 0       # Poses the formula returned a path for
+        self.failures = 0    # Paths that do not reach the target
+        self.errors = 0      # Exceptions raised by the formula
+        self.seconds = 0.0
+        self.max_position = 0.0
+        self.max_heading = 0.0
+        self.worst = None    # Pose with the largest position error, or the last exception
+
+    def record(self, pose, position, heading, tolerance):
+        self.max_heading = max(self.max_heading, heading)
+        if position > self.max_position:
+            self.max_position = position
+            self.worst = pose
+        if position > tolerance or heading > tolerance:
+            self.failures += 1
+
+    def report(self):
+        return {
+            'calls': self.calls,
+            'valid': self.valid,
+            'failures': self.failures,
+            'errors': self.errors,
+            'calls_per_s': round(self.calls / self.seconds, 1) if self.seconds else None,
+            'max_position_error': self.max_position,
+            'max_heading_error': self.max_heading,
+            'worst_pose': self.worst,
+        }
+
+def fuzz_scalar(poses, r=MIN_RADIUS, tolerance=1e-6):
+    """
+    Time every family/variant of reeds_shepp on each pose and check that the
+    path it returns reaches the pose. Returns {(family, variant): FamilyStats}.
+    """
+    stats = {(family, name): FamilyStats() for family in range(1, 13) for name, _, _, _ in VARIANTS}
+
+    for pose in poses:
+        for family, path_fn in enumerate(PATH_FNS, start=1):
+            for name, transform, gear_sign, steering_sign in VARIANTS:
+                s = stats[(family, name)]
+                x, y, theta = transform(*pose)
+                s.calls += 1
+                t = time.perf_counter()
+                try:
+                    segments = path_fn(x, y, theta, r, rs._segment)
+                except (ValueError, ZeroDivisionError) as e:
+                    s.seconds += time.perf_counter() - t
+                    s.errors += 1
+                    s.worst = (pose, repr(e))
+                    continue
+                s.seconds += time.perf_counter() - t
+
+                if not segments:
+                    continue
+                s.valid += 1
+                path = PackedPath.from_segments(segments)
+                if gear_sign < 0:
+                    path = path.timeflip()
+                if steering_sign < 0:
+                    path = path.reflect()
+                s.record(pose, *pose_error(path, pose, r), tolerance)
+
+    return stats
+
+def fuzz_batch(poses, r=MIN_RADIUS, tolerance=1e-6, chunk=4096):
+    """
+    Validate reeds_shepp_batch against the same oracle: every candidate it
+    marks valid must reach the pose, and it must find the same candidates as
+    the scalar formulas. Returns ({(family, variant): FamilyStats}, seconds):
+    the batch solves all 48 candidates at once, so there is no time per
+    family, only the total seconds spent in it.
+    """
+    import numpy as np
+    import reeds_shepp_batch as rb
+
+    stats = {(family, name): FamilyStats() for family in range(1, 13) for name, _, _, _ in VARIANTS}
+    keys = [(family, name) for family in range(1, 13) for name, _, _, _ in VARIANTS]
+    poses = list(poses)
+    seconds = 0.0
+
+    for begin in range(0, len(poses), chunk):
+        block = np.array(poses[begin:begin + chunk], dtype=float)
+        t = time.perf_counter()
+        lengths, steering, gear, valid = rb.get_all_paths_relative_batch(block[:, 0], block[:, 1], block[:, 2], r)
+        seconds += time.perf_counter() - t
+
+        for k, key in enumerate(keys):
+            s = stats[key]
+            s.calls += len(block)
+            family, _ = key
+            transform, gear_sign, steering_sign = VARIANTS[k % 4][1:]
+            for n in range(len(block)):
+                pose = tuple(poses[begin + n])
+                try:
+                    scalar = [e for e in PATH_FNS[family - 1](*transform(*pose), r, rs._segment) if e[0] != 0]
+                except (ValueError, ZeroDivisionError):
+                    scalar = []
+                if bool(scalar) != bool(valid[n, k]):
+                    # Candidate found by only one of the two solvers
+                    s.errors += 1
+                    s.worst = (pose, 'scalar' if scalar else 'batch')
+                if not valid[n, k]:
+                    continue
+                s.valid += 1
+                s.record(pose, *pose_error(PackedPath.from_batch(lengths, steering, gear, n, k), pose, r), tolerance)
+
+    return stats, seconds
+
+def summarize(stats, batch=None):
+    """
+    Per-family totals (all variants) plus the per-variant detail, as a dict.
+    batch is (poses, seconds) of a fuzz_batch run, reported as one throughput.
+    """
+    families = {}
+    for (family, name), s in stats.items():
+        total = families.setdefault(family, FamilyStats())
+        total.calls += s.calls
+        total.valid += s.valid
+        total.failures += s.failures
+        total.errors += s.errors
+        total.seconds += s.seconds
+        total.max_heading = max(total.max_heading, s.max_heading)
+        if s.max_position >= total.max_position:
+            total.max_position = s.max_position
+            total.worst = s.worst if s.worst is not None else total.worst
+
+    report = {
+        'families': {f"path{family}": s.report() for family, s in sorted(families.items())},
+        'variants': {f"path{family}/{name}": s.report() for (family, name), s in stats.items()},
+    }
+    if batch is not None:
+        poses, seconds = batch
+        report['batch'] = {
+            'poses': poses,
+            'seconds': seconds,
+            'poses_per_s': round(poses / seconds, 1) if seconds else None,
+        }
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz and time the Reeds-Shepp path families.")
+    parser.add_argument('--samples', type=int, default=100000, help="number of relative poses")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--radius', type=float, default=MIN_RADIUS)
+    parser.add_argument('--tolerance', type=float, default=1e-6, help="allowed end pose error, in cm and degrees")
+    parser.add_argument('--edge-fraction', type=float, default=0.2, help="share of poses sampled near fragile cases")
+    parser.add_argument('--batch', action='store_true', help="validate reeds_shepp_batch instead of the scalar formulas")
+    parser.add_argument('--output', help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    poses = sample_poses(args.samples, args.seed, r=args.radius, edge_fraction=args.edge_fraction)
+    if args.batch:
+        stats, seconds = fuzz_batch(poses, args.radius, args.tolerance)
+        report = summarize(stats, (args.samples, seconds))
+    else:
+        report = summarize(fuzz_scalar(poses, args.radius, args.tolerance))
+
+    for family, s in report['families'].items():
+        speed = f"{s['calls_per_s']:>12.1f} calls/s  " if s['calls_per_s'] is not None else ''
+        print(f"{family:>7}: {speed}valid {s['valid']:>8}  "
+              f"failures {s['failures']:>5}  errors {s['errors']:>5}  max error {s['max_position_error']:.2e} cm")
+    if 'batch' in report:
+        b = report['batch']
+        print(f"  batch: {b['poses_per_s'] or 0:.1f} poses/s, all {len(stats)} candidates each")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failed = any(s['failures'] or s['errors'] for s in report['families'].values())
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
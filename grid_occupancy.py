@@ -0,0 +1,77 @@
+ROBOT_CELLS = 3 # The grid simulator's robot covers 3x3 cells from its (x, y)
+MARGIN = ROBOT_CELLS - 1 # Blocked border cells kept around the arena
+
+# Footprint mask of one row: the robot's 3 cells starting at bit x
+ROW_MASK = (1 << ROBOT_CELLS) - 1
+
+class GridOccupancy:
+    """
+    Bitset occupancy grid for the discrete simulator: one int per row, with a
+    bit set for every cell covered by a pillar's 3x3 collision zone and for a
+    border of MARGIN blocked cells around the arena. Checking a robot position
+    is then three shifts and masks instead of comparing the footprint with
+    every pillar cell.
+
+    Pillars are reference counted per cell so overlapping collision zones
+    can be added and removed in any order.
+    """
+    def __init__(self, size, pillars=()):
+        self.size = size
+        self.width = size + 2 * MARGIN
+        self.counts = bytearray(size * size) # Pillars covering each arena cell
+        self.pillars = []
+
+        border = (1 << self.width) - 1
+        inner = border ^ (((1 << size) - 1) << MARGIN)
+        self.rows = [border] * MARGIN + [inner] * size + [border] * MARGIN
+
+        for x, y in pillars:
+            self.add_pillar(x, y)
+
+    def zone(self, x, y):
+        """ Arena cells in the collision zone of a pillar at (x, y). """
+        for cx in range(max(x - 1, 0), min(x + 2, self.size)):
+            for cy in range(max(y - 1, 0), min(y + 2, self.size)):
+                yield cx, cy
+
+    def add_pillar(self, x, y):
+        self.pillars.append((x, y))
+        for cx, cy in self.zone(x, y):
+            self.counts[cy * self.size + cx] += 1
+            self.rows[cy + MARGIN] |= 1 << (cx + MARGIN)
+
+    def remove_pillar(self, x, y):
+        self.pillars.remove((x, y))
+        for cx, cy in self.zone(x, y):
+            self.counts[cy * self.size + cx] -= 1
+            if not self.counts[cy * self.size + cx]:
+                self.rows[cy + MARGIN] &= ~(1 << (cx + MARGIN))
+
+    def sync(self, pillars):
+        """ Update the grid to match a list of (x, y) pillar cells, touching only the ones that changed. """
+        current = list(self.pillars)
+        wanted = list(pillars)
+        for pillar in wanted:
+            if pillar in current:
+                current.remove(pillar)
+            else:
+                self.add_pillar(*pillar)
+        for pillar in current:
+            self.remove_pillar(*pillar)
+
+    def blocked(self, x, y):
+        """ Whether a robot with its bottom-left cell at (x, y) overlaps a pillar zone or leaves the arena. """
+        if not (-MARGIN <= x <= self.size - 1 and -MARGIN <= y <= self.size - 1):
+            return True
+        shift = x + MARGIN
+        row = y + MARGIN
+        rows = self.rows
+        return bool(((rows[row] | rows[row + 1] | rows[row + 2]) >> shift) & ROW_MASK)
+
+    def pillar_blocked(self, x, y):
+        """
+        Whether the robot at (x, y) overlaps a pillar zone, ignoring the arena
+        border (zones are not clipped here). Only needed to tell the two kinds
+        of collision apart, so it simply scans the pillars.
+        """
+        return any(x - 1 <= px <= x + ROBOT_CELLS and y - 1 <= py <= y + ROBOT_CELLS for px, py in self.pillars)
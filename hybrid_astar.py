@@ -0,0 +1,128 @@
+import math
+import time
+import heapq
+import reeds_shepp as rs
+from reeds_shepp import PathElement, Steering, Gear
+from kinematics import advance
+
+# Expansions from every node: forward and backward, left, straight and right
+MOTIONS = [(steering, gear) for gear in (Gear.FORWARD, Gear.BACKWARD)
+           for steering in (Steering.LEFT, Steering.STRAIGHT, Steering.RIGHT)]
+
+class HybridAStar:
+    """
+    Hybrid A* leg planner for legs where every direct Reeds-Shepp candidate
+    collides. Nodes are continuous poses, expanded with arcs at the robot's
+    minimum radius and straights of step cm, and a closed set of poses binned
+    to xy_resolution cm and heading_bins headings prunes revisits. Every
+    analytic_every expansions the shortest obstacle-free Reeds-Shepp path
+    from the node to the goal is tried, and the search ends at the first one
+    that is collision-free. The start node is never tried: the planner is
+    only asked for legs whose direct paths all collide.
+
+    Collisions are checked with the robot's own simulate_reeds_shepps_path,
+    so the planner follows whatever checker and collision index it uses.
+    """
+    def __init__(self, robot, step=15, xy_resolution=10, heading_bins=24, analytic_every=3,
+                 max_expansions=2000, budget=0.2):
+        self.robot = robot
+        self.step = step
+        self.xy_resolution = xy_resolution
+        self.heading_bins = heading_bins
+        self.analytic_every = analytic_every
+        self.max_expansions = max_expansions
+        self.budget = budget # Seconds per leg, None for no limit
+        self.expansions = 0 # Over all legs, for profiling
+
+    def settings(self):
+        """ Constructor arguments besides the robot, to build the same planner for another robot. """
+        return {'step': self.step, 'xy_resolution': self.xy_resolution, 'heading_bins': self.heading_bins,
+                'analytic_every': self.analytic_every, 'max_expansions': self.max_expansions,
+                'budget': self.budget}
+
+    def key(self, x, y, degrees):
+        return (round(x / self.xy_resolution), round(y / self.xy_resolution),
+                round(degrees * self.heading_bins / 360) % self.heading_bins)
+
+    def collides(self, path, pose):
+        collision_detected, _, _, _ = self.robot.simulate_reeds_shepps_path(path, pose[0], pose[1], pose[2])
+        return collision_detected
+
+    def analytic(self, pose, goal):
+        """ The shortest Reeds-Shepp path from pose to goal if it is collision-free, else None. """
+        path = rs.get_optimal_path(pose, goal, self.robot.min_radius)
+        if path is None or self.collides(path, pose):
+            return None
+        return path
+
+    def plan(self, start, goal):
+        """
+        Return a collision-free path (list of PathElement) from start to goal,
+        both (x, y, degrees), or None if none was found within max_expansions
+        nodes and budget seconds.
+        """
+        deadline = None if self.budget is None else time.perf_counter() + self.budget
+        expired = lambda: deadline is not None and time.perf_counter() > deadline
+        gx, gy, _ = goal
+        r = self.robot.min_radius
+
+        # Node: (pose, parent node, PathElement from the parent)
+        nodes = [(tuple(start), None, None)]
+        cost = {self.key(*start): 0}
+        closed = set()
+        frontier = [(math.hypot(gx - start[0], gy - start[1]), 0, 0)]
+        expanded = 0
+
+        while frontier and expanded < self.max_expansions and not expired():
+            _, g, index = heapq.heappop(frontier)
+            pose = nodes[index][0]
+            key = self.key(*pose)
+            if key in closed:
+                continue
+            closed.add(key)
+
+            if expanded and expanded % self.analytic_every == 0:
+                if expired():
+                    break
+                path = self.analytic(pose, goal)
+                if path is not None:
+                    self.expansions += expanded
+                    return self.reconstruct(nodes, index) + list(path)
+            expanded += 1
+
+            for steering, gear in MOTIONS:
+                # Each motion is a collision check, so stop between them
+                if expired():
+                    break
+                element = PathElement(self.step, steering, gear)
+                if self.collides([element], pose):
+                    continue
+                new_pose = advance(pose[0], pose[1], pose[2], steering, gear, self.step, r)
+                new_key = self.key(*new_pose)
+                new_cost = g + self.step
+                if new_key in closed or new_cost >= cost.get(new_key, math.inf):
+                    continue
+                cost[new_key] = new_cost
+                nodes.append((new_pose, index, element))
+                heapq.heappush(frontier, (new_cost + math.hypot(gx - new_pose[0], gy - new_pose[1]), new_cost, len(nodes) - 1))
+
+        self.expansions += expanded
+        return None
+
+    def reconstruct(self, nodes, index):
+        """ Elements from the start to nodes[index], with consecutive equal motions merged. """
+        elements = []
+        while nodes[index][1] is not None:
+            _, index, element = nodes[index]
+            elements.append(element)
+
+        path = []
+        for element in reversed(elements):
+            if path and path[-1].steering == element.steering and path[-1].gear == element.gear:
+                path[-1] = PathElement(path[-1].param + element.param, element.steering, element.gear)
+            else:
+                path.append(element)
+        return path
+
+    def __call__(self, start, goal):
+        return self.plan(start, goal)
@@ -0,0 +1,166 @@
+import sys
+import time
+import cProfile
+import functools
+import importlib
+import reeds_shepp as rs
+
+# (module, attribute, stage) of every function the instrumentation wraps.
+# Attributes are patched on the module or class that callers look them up on,
+# so nothing changes for callers and nothing is wrapped while disabled.
+TARGETS = [
+    ('reeds_shepp', '_cached_candidates', 'rs_lookup'),
+    ('reeds_shepp', '_candidate_records', 'rs_solve'),
+    ('reeds_shepp', 'get_all_paths', 'get_all_paths'),
+    ('reeds_shepp', 'get_sorted_paths', 'get_sorted_paths'),
+    ('robot', 'Robot.simulate_reeds_shepps_path', 'simulate'),
+    ('robot', 'Robot.collision_detected', 'collision_detected'),
+    ('validation', 'PillarObstacles.footprint_blocked', 'footprint_blocked'),
+    ('collision_index', 'OccupancyGrid.footprint_blocked', 'footprint_blocked'),
+    ('cspace', 'CSpaceTable.footprint_blocked', 'footprint_blocked'),
+    ('adaptive_sampler', 'AdaptiveSampler.clearance', 'clearance'),
+    ('legs', 'LegMatrix.solve_leg', 'leg'),
+    ('tour', 'held_karp', 'tour'),
+    ('tour', 'branch_and_bound', 'tour'),
+    ('planner', 'generalized_held_karp', 'tour'),
+]
+
+class Stats:
+    """
+    Calls and total seconds per stage. Times are inclusive: a simulate call
+    also counts the footprint_blocked calls it makes.
+    """
+    def __init__(self):
+        self.timers = {}  # stage -> [calls, seconds]
+        self.cache_start = (0, 0)
+
+    def timer(self, stage):
+        return self.timers.setdefault(stage, [0, 0.0])
+
+    def calls(self, stage):
+        return self.timers.get(stage, [0, 0.0])[0]
+
+    def report(self):
+        """ Return the collected numbers as a JSON-serializable dict. """
+        stages = {}
+        for stage, (calls, seconds) in sorted(self.timers.items()):
+            if not calls:
+                continue
+            stages[stage] = {
+                'calls': calls,
+                'total_ms': round(seconds * 1000, 3),
+                'mean_us': round(seconds / calls * 1e6, 3) if calls else None,
+            }
+
+        legs = self.calls('leg')
+        hits = rs.path_cache.hits - self.cache_start[0]
+        misses = rs.path_cache.misses - self.cache_start[1]
+        return {
+            'stages': stages,
+            'per_leg': {
+                'legs': legs,
+                'simulations': round(self.calls('simulate') / legs, 3) if legs else None,
+                'samples': round(self.calls('footprint_blocked') / legs, 3) if legs else None,
+            },
+            'path_cache': {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+                'size': len(rs.path_cache.entries),
+            },
+        }
+
+# Stats of the current session, None while disabled
+stats = None
+_originals = []
+
+def _resolve(module_name, attribute):
+    owner = importlib.import_module(module_name)
+    *path, name = attribute.split('.')
+    for part in path:
+        owner = getattr(owner, part)
+    return owner, name
+
+def _timed(fn, timer):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timer[0] += 1
+            timer[1] += time.perf_counter() - start
+    return wrapper
+
+def enable(stages=None):
+    """
+    Start a new instrumentation session by wrapping every TARGETS function
+    with a timer, or only those of the given stages. Returns the Stats that
+    collects the numbers.
+    """
+    global stats
+    if stats is not None:
+        disable()
+
+    stats = Stats()
+    stats.cache_start = (rs.path_cache.hits, rs.path_cache.misses)
+    for module_name, attribute, stage in TARGETS:
+        if stages is not None and stage not in stages:
+            continue
+        owner, name = _resolve(module_name, attribute)
+        original = owner.__dict__[name]
+        _originals.append((owner, name, original))
+        setattr(owner, name, _timed(original, stats.timer(stage)))
+    return stats
+
+def disable():
+    """ Put the original functions back. Returns the Stats of the session. """
+    global stats
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+    session, stats = stats, None
+    return session
+
+class instrumented:
+    """
+    Context manager that enables instrumentation for its block:
+
+        with instrumented() as session:
+            find_best_tour(robot, waypoints)
+        print(session.report())
+    """
+    def __init__(self, stages=None):
+        self.stages = stages
+
+    def __enter__(self):
+        return enable(self.stages)
+
+    def __exit__(self, *exc):
+        disable()
+        return False
+
+def profile(fn, *args, dump=None, **kwargs):
+    """
+    Run fn(*args, **kwargs) under cProfile. Returns (result, profiler), and
+    writes the stats to dump for pstats or snakeviz if it is given.
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    if dump is not None:
+        profiler.dump_stats(dump)
+    return result, profiler
+
+def main(argv=None):
+    """
+    planner.py with the instrumentation report on: takes the same arguments,
+    and prints the report to stderr unless --report names a file.
+    """
+    from planner import main as plan_main
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if '--report' not in argv and not any(arg.startswith('--report=') for arg in argv):
+        argv.append('--report')
+    return plan_main(argv)
+
+if __name__ == '__main__':
+    sys.exit(main())
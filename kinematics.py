@@ -0,0 +1,37 @@
+import math
+from reeds_shepp import Steering, Gear
+from params import MIN_RADIUS
+
+def heading_sign(steering, gear):
+    """
+    Return +1 if the segment turns the robot anticlockwise, -1 if clockwise and
+    0 for straight segments, matching Robot.execute_maneuver.
+    """
+    if steering == Steering.STRAIGHT:
+        return 0
+    turn = 1 if steering == Steering.LEFT else -1
+    return turn if gear == Gear.FORWARD else -turn
+
+def turning_center(x, y, degrees, steering, r=MIN_RADIUS):
+    """ Return the centre of the circle the robot's (x, y) follows for an arc segment. """
+    theta = math.radians(degrees)
+    if steering == Steering.LEFT:
+        return x - r * math.sin(theta), y + r * math.cos(theta)
+    return x + r * math.sin(theta), y - r * math.cos(theta)
+
+def advance(x, y, degrees, steering, gear, distance, r=MIN_RADIUS):
+    """
+    Return the pose (x, y, degrees) reached by driving distance along one
+    Reeds-Shepp segment from (x, y, degrees). degrees is kept in [0, 360).
+    """
+    if steering == Steering.STRAIGHT:
+        direction = 1 if gear == Gear.FORWARD else -1
+        theta = math.radians(degrees)
+        return x + direction * distance * math.cos(theta), y + direction * distance * math.sin(theta), degrees % 360
+
+    radius = r if steering == Steering.LEFT else -r
+    d_angle = heading_sign(steering, gear) * math.degrees(distance / r)
+    new_degrees = (degrees + d_angle) % 360
+    x += radius * (math.sin(math.radians(new_degrees)) - math.sin(math.radians(degrees)))
+    y -= radius * (math.cos(math.radians(new_degrees)) - math.cos(math.radians(degrees)))
+    return x, y, new_degrees
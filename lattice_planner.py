@@ -0,0 +1,251 @@
+import sys
+import json
+import math
+import heapq
+import argparse
+import functools
+from arena import world2grid
+from grid_occupancy import GridOccupancy
+from pillars import get_pillars
+from planner import START
+from validation import Pose
+from params import ARENA_WIDTH, CELL_SIZE
+
+GRID_SIZE = ARENA_WIDTH // CELL_SIZE
+TURNING_RADIUS = 4 # In cells, as simulator.Robot.turning_radius
+ARC_SAMPLES = 8 # Points per quarter turn used to find the cells a turn sweeps
+
+# Headings counter-clockwise, so turning left is +1. Unit steps in cells.
+HEADINGS = ['E', 'N', 'W', 'S']
+STEPS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+GRID_HEADINGS = {'R': 'E', 'U': 'N', 'L': 'W', 'D': 'S'} # arena.world2grid names
+
+# Offsets turned clockwise by 0 to 3 quarter turns
+ROTATIONS = [
+    lambda dx, dy: (dx, dy),
+    lambda dx, dy: (dy, -dx),
+    lambda dx, dy: (-dx, -dy),
+    lambda dx, dy: (-dy, dx),
+]
+
+# The simulator.Robot moves: (command, gear, turn), gear 1 forward and -1
+# backward, turn 1 left, -1 right and 0 straight. Commands are the keys of
+# simulator.COMMANDS, so a plan can be replayed there.
+MOTIONS = [
+    ('F', 1, 0),
+    ('B', -1, 0),
+    ('FL', 1, 1),
+    ('FR', 1, -1),
+    ('BL', -1, 1),
+    ('BR', -1, -1),
+]
+
+def primitive(heading, gear, turn, radius=TURNING_RADIUS):
+    """
+    Return (dx, dy, new heading, cost, swept) for one move from heading, in
+    robot centre cells. swept lists the centre cells the move passes through,
+    relative to the start and ending with the end cell. Turns are quarter
+    circles of radius cells, cost is the distance driven in cells.
+    """
+    fx, fy = STEPS[heading]
+    if not turn:
+        return gear * fx, gear * fy, heading, 1, [(gear * fx, gear * fy)]
+
+    # Reversing while steering right turns the heading left, like the simulator
+    sx, sy = STEPS[(heading + turn) % 4] # Towards the turning circle's centre
+    new_heading = (heading + turn * gear) % 4
+    swept = []
+    for i in range(1, ARC_SAMPLES + 1):
+        phi = math.pi / 2 * i / ARC_SAMPLES
+        along, across = math.sin(phi) * radius * gear, (1 - math.cos(phi)) * radius
+        cell = (round(along * fx + across * sx), round(along * fy + across * sy))
+        if cell not in swept:
+            swept.append(cell)
+    dx, dy = swept[-1]
+    return dx, dy, new_heading, math.pi / 2 * radius, swept
+
+@functools.lru_cache(maxsize=None)
+def free_space_costs(size=GRID_SIZE, radius=TURNING_RADIUS):
+    """
+    Cost-to-go of the lattice without obstacles, for the A* heuristic: for the
+    goal at offset (0, 0) facing 'E', costs[heading][(dy + w) * (2w + 1) + dx + w]
+    is the cheapest way to it from offset (dx, dy) with heading, w = size +
+    2 * radius. Obstacles only add cost, so it never overestimates (the window
+    leaves room for the detours free-space paths take). Computed once per
+    process with a backward Dijkstra.
+    """
+    w = size + 2 * radius
+    side = 2 * w + 1
+    # Moves into a state facing each heading: (previous heading, dx, dy, cost)
+    incoming = [[] for _ in range(4)]
+    for heading in range(4):
+        for _, gear, turn in MOTIONS:
+            dx, dy, new_heading, cost, _ = primitive(heading, gear, turn, radius)
+            incoming[new_heading].append((heading, dx, dy, cost))
+
+    costs = [[math.inf] * (side * side) for _ in range(4)]
+    costs[0][w * side + w] = 0
+    frontier = [(0, w, w, 0)]
+    while frontier:
+        cost, x, y, heading = heapq.heappop(frontier)
+        if cost > costs[heading][y * side + x]:
+            continue
+        for previous, dx, dy, step_cost in incoming[heading]:
+            px, py = x - dx, y - dy
+            if 0 <= px < side and 0 <= py < side and cost + step_cost < costs[previous][py * side + px]:
+                costs[previous][py * side + px] = cost + step_cost
+                heapq.heappush(frontier, (cost + step_cost, px, py, previous))
+    return costs
+
+class Lattice:
+    """
+    A* over (centre cell x, centre cell y, heading) states with the simulator's
+    motion primitives. A state is free when the 3x3 robot footprint around its
+    centre cell clears the GridOccupancy of the pillars, and a move is allowed
+    when every cell it sweeps is free.
+
+    Like GridOccupancy, free cells are kept as one int per row, and for every
+    heading and move a row bitset marks the start cells from which the whole
+    swept path is free, so the search only tests one bit per successor.
+    """
+    def __init__(self, pillar_cells, size=GRID_SIZE, radius=TURNING_RADIUS):
+        self.size = size
+        self.radius = radius
+        occupancy = GridOccupancy(size, pillar_cells)
+        self.rows = [sum(1 << x for x in range(size) if not occupancy.blocked(x - 1, y - 1)) for y in range(size)]
+        self.moves = []
+        for heading in range(4):
+            moves = []
+            for command, gear, turn in MOTIONS:
+                dx, dy, new_heading, cost, swept = primitive(heading, gear, turn, radius)
+                moves.append((command, dx, dy, new_heading, cost, self.allowed(swept)))
+            self.moves.append(moves)
+
+    def allowed(self, swept):
+        """ Row bitsets of the cells from which every cell of swept (relative offsets) is free. """
+        full = (1 << self.size) - 1
+        allowed = []
+        for y in range(self.size):
+            row = full
+            for cx, cy in swept:
+                if not 0 <= y + cy < self.size:
+                    row = 0
+                    break
+                free = self.rows[y + cy]
+                row &= free >> cx if cx >= 0 else (free << -cx) & full
+            allowed.append(row)
+        return allowed
+
+    @classmethod
+    def from_pillars(cls, pillars, size=GRID_SIZE, radius=TURNING_RADIUS):
+        """ Lattice for pillars.Pillar objects, which are given in cm. """
+        return cls([(pillar.x // CELL_SIZE, pillar.y // CELL_SIZE) for pillar in pillars], size, radius)
+
+    def is_free(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size and bool((self.rows[y] >> x) & 1)
+
+    def search(self, start, goal):
+        """
+        Return the list of commands from start to goal, both (x, y, heading
+        index), or None if goal cannot be reached. The heuristic is the
+        obstacle-free lattice cost from free_space_costs, which is admissible.
+        """
+        if not (self.is_free(start[0], start[1]) and self.is_free(goal[0], goal[1])):
+            return None
+        gx, gy, gh = goal
+        costs = free_space_costs(self.size, self.radius)
+        w = self.size + 2 * self.radius
+        side = 2 * w + 1
+        rotate = ROTATIONS[gh]
+
+        def heuristic(x, y, heading):
+            # Turn the offset into the frame where the goal faces 'E'
+            dx, dy = rotate(x - gx, y - gy)
+            return costs[(heading - gh) % 4][(dy + w) * side + dx + w]
+
+        came_from = {start: None}
+        cost = {start: 0}
+        closed = set()
+        frontier = [(heuristic(*start), 0, start)]
+        pushed = 1
+        while frontier:
+            _, _, state = heapq.heappop(frontier)
+            if state == goal:
+                commands = []
+                while came_from[state] is not None:
+                    state, command = came_from[state]
+                    commands.append(command)
+                return commands[::-1]
+            if state in closed:
+                continue
+            closed.add(state)
+
+            x, y, heading = state
+            g = cost[state]
+            for command, dx, dy, new_heading, step_cost, allowed in self.moves[heading]:
+                if not (allowed[y] >> x) & 1:
+                    continue
+                nx, ny = x + dx, y + dy
+                new_state = (nx, ny, new_heading)
+                new_cost = g + step_cost
+                if new_state in closed or new_cost >= cost.get(new_state, math.inf):
+                    continue
+                cost[new_state] = new_cost
+                came_from[new_state] = (state, command)
+                heapq.heappush(frontier, (new_cost + heuristic(nx, ny, new_heading), pushed, new_state))
+                pushed += 1
+        return None
+
+def grid_state(pose):
+    """ Lattice state of a world pose (x, y, degrees) in cm, using arena.world2grid. """
+    (x, y), direction = world2grid(Pose(*pose))
+    return x, y, HEADINGS.index(GRID_HEADINGS[direction])
+
+def plan_to_pillars(pillar_data, start=START, lattice=None):
+    """
+    Plan primitive sequences visiting the viewing cell of every pillar in
+    pillar_data (a list of (x, y, card_dir) in cm), in the given order, from
+    the world pose start. Returns one list of simulator commands per leg, or
+    None for the first leg that cannot be driven (planning stops there).
+
+    To replay a plan in the simulator, start its robot with its bottom-left
+    cell one cell below and left of the start's centre cell.
+    """
+    pillars = get_pillars([tuple(p) for p in pillar_data])
+    if lattice is None:
+        lattice = Lattice.from_pillars(pillars)
+
+    legs = []
+    state = grid_state(start)
+    for pillar in pillars:
+        if pillar.card_dir == 'X':
+            continue
+        goal = grid_state(pillar.getWaypoint())
+        commands = lattice.search(state, goal)
+        legs.append(commands)
+        if commands is None:
+            break
+        state = goal
+    return legs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan simulator moves to each pillar's viewing cell with lattice A*.")
+    parser.add_argument('input', nargs='?', help="JSON file with the pillars, default: read stdin. Either a list of "
+                        "[x, y, card_dir] or an object with 'pillars' and optionally 'start': [x, y, degrees]")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        with open(args.input) as f:
+            data = json.load(f)
+    else:
+        data = json.load(sys.stdin)
+    if isinstance(data, list):
+        data = {'pillars': data}
+
+    legs = plan_to_pillars(data['pillars'], tuple(data.get('start', START)))
+    json.dump({'legs': legs}, sys.stdout)
+    print()
+    return 0 if None not in legs else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
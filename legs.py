@@ -0,0 +1,138 @@
+import math
+import reeds_shepp as rs
+
+class LegMatrix:
+    """
+    Shortest collision-free Reeds-Shepp leg between every ordered pair of
+    nodes, computed once per arena.
+
+    nodes[0] is the start pose and nodes[1:] the waypoints. No leg ever returns
+    to the start, so n waypoints need n * n leg solves (42 for 6 pillars).
+
+    fallback(start, end), e.g. a hybrid_astar.HybridAStar, is asked for a path
+    when every direct candidate of a leg collides.
+    """
+    def __init__(self, robot, nodes, solve=True, fallback=None):
+        self.robot = robot
+        self.nodes = list(nodes)
+        self.fallback = fallback
+        self.solves = 0 # Number of legs solved, for profiling
+
+        n = len(self.nodes)
+        self.costs = [[math.inf] * n for _ in range(n)]
+        self.paths = [[None] * n for _ in range(n)]
+        self.solved = [[False] * n for _ in range(n)]
+
+        if solve:
+            for i in range(n):
+                self.solve_row(i)
+
+    def solve_row(self, i):
+        """ Solve every leg leaving nodes[i]. Returns (costs, paths) for that row. """
+        for j in range(1, len(self.nodes)):
+            if i != j:
+                self.solve_leg(i, j)
+        return self.costs[i], self.paths[i]
+
+    def solve_leg(self, i, j):
+        """
+        Find the shortest collision-free path from nodes[i] to nodes[j] and
+        store it. Returns the chosen path, or None if every candidate collides
+        and the fallback (if any) finds nothing either.
+        """
+        self.solves += 1
+        self.solved[i][j] = True
+        start = self.nodes[i]
+
+        for potential_path in rs.iter_sorted_paths(start, self.nodes[j]):
+            collision_detected, _, _, _ = self.robot.simulate_reeds_shepps_path(potential_path, start[0], start[1], start[2])
+            if not collision_detected:
+                self.costs[i][j] = rs.path_length(potential_path)
+                self.paths[i][j] = potential_path
+                return potential_path
+
+        path = self.fallback(start, self.nodes[j]) if self.fallback is not None else None
+        self.costs[i][j] = math.inf if path is None else rs.path_length(path)
+        self.paths[i][j] = path
+        return path
+
+    def leg_cost(self, i, j):
+        """ Length of the leg from node i to node j, solving it first if needed. """
+        if not self.solved[i][j]:
+            if j == 0 or i == j:
+                return math.inf
+            self.solve_leg(i, j)
+        return self.costs[i][j]
+
+    def lazy_costs(self):
+        """
+        Cost matrix view for the tour solvers that only solves a leg when it is
+        first looked at, so a search that never considers a leg never pays for it.
+        """
+        return LazyCosts(self)
+
+    def estimates(self):
+        """
+        Lower bounds on every leg cost: the length of the shortest Reeds-Shepp
+        path ignoring obstacles. Later leg solves reuse the cached candidates.
+        """
+        n = len(self.nodes)
+        estimate = [[math.inf] * n for _ in range(n)]
+        for i in range(n):
+            for j in range(1, n):
+                if i != j:
+                    path = next(rs.iter_sorted_paths(self.nodes[i], self.nodes[j]), None)
+                    if path is not None:
+                        estimate[i][j] = rs.path_length(path)
+        return estimate
+
+    def cost(self, i, j):
+        """ Length of the leg from node i to node j, math.inf if it is blocked. """
+        return self.costs[i][j]
+
+    def path(self, i, j):
+        """ Path (PackedPath, or list of PathElement from the fallback) for the leg from node i to node j, or None. """
+        return self.paths[i][j]
+
+    def tour_length(self, order):
+        """ Total length of visiting the nodes in order, starting from node 0. """
+        prev = 0
+        length = 0
+        for node in order:
+            length += self.costs[prev][node]
+            prev = node
+        return length
+
+    def tour_paths(self, order):
+        """ List of leg paths for visiting the nodes in order, starting from node 0. """
+        prev = 0
+        paths = []
+        for node in order:
+            paths.append(self.paths[prev][node])
+            prev = node
+        return paths
+
+class LazyCosts:
+    """ cost[i][j] view of a LegMatrix that solves legs on first access. """
+    def __init__(self, legs):
+        self.legs = legs
+
+    def __len__(self):
+        return len(self.legs.nodes)
+
+    def __getitem__(self, i):
+        return LazyRow(self.legs, i)
+
+class LazyRow:
+    def __init__(self, legs, i):
+        self.legs = legs
+        self.i = i
+
+    def __len__(self):
+        return len(self.legs.nodes)
+
+    def __getitem__(self, j):
+        return self.legs.leg_cost(self.i, j)
+
+    def __iter__(self):
+        return (self.legs.leg_cost(self.i, j) for j in range(len(self.legs.nodes)))
@@ -0,0 +1,109 @@
+from array import array
+from reeds_shepp import PathElement, Steering, Gear
+
+class PackedPath:
+    """
+    Reeds-Shepp path stored as three flat arrays (segment lengths, steering
+    codes and gear codes) instead of a list of PathElement dataclasses.
+
+    timeflip and reflect return views that share the arrays and only flip a
+    sign, so transforming a path allocates nothing per segment. Iterating
+    yields PathElement objects, so drawing and printing code can use a
+    PackedPath like a list of PathElement. The Reeds-Shepp candidates from
+    reeds_shepp.get_all_paths and friends are PackedPaths.
+    """
+    __slots__ = ('lengths', 'steering', 'gear', 'steering_sign', 'gear_sign', 'total')
+
+    def __init__(self, lengths, steering, gear, steering_sign=1, gear_sign=1, total=None):
+        self.lengths = lengths      # array('d') of segment lengths, all >= 0
+        self.steering = steering    # array('b') of Steering values
+        self.gear = gear            # array('b') of Gear values
+        self.steering_sign = steering_sign
+        self.gear_sign = gear_sign
+        self.total = total          # Total length, computed on first use if None
+
+    @classmethod
+    def from_elements(cls, path):
+        """ Pack a list of PathElement. """
+        return cls(array('d', [e.param for e in path]),
+                   array('b', [e.steering.value for e in path]),
+                   array('b', [e.gear.value for e in path]))
+
+    @classmethod
+    def from_segments(cls, segments, steering_sign=1, gear_sign=1, total=None):
+        """
+        Pack (param, steering, gear) tuples as produced by the reeds_shepp
+        path functions, turning negative params into the opposite gear like
+        PathElement.create. The signs apply the timeflip/reflect of a variant.
+        """
+        return cls(array('d', [abs(param) for param, _, _ in segments]),
+                   array('b', [s.value for _, s, _ in segments]),
+                   array('b', [g.value if param >= 0 else -g.value for param, _, g in segments]),
+                   steering_sign, gear_sign, total)
+
+    @classmethod
+    def from_batch(cls, lengths, steering, gear, n, k):
+        """
+        Pack candidate k of pose pair n from reeds_shepp_batch arrays, dropping
+        unused and zero-length segments. Returns None if it is invalid.
+        """
+        keep = [i for i in range(lengths.shape[2]) if gear[n, k, i] != 0 and lengths[n, k, i] != 0]
+        if not keep:
+            return None
+        return cls(array('d', [float(lengths[n, k, i]) for i in keep]),
+                   array('b', [int(steering[n, k, i]) for i in keep]),
+                   array('b', [int(gear[n, k, i]) for i in keep]))
+
+    def timeflip(self):
+        """ View of the path with every gear reversed. """
+        return PackedPath(self.lengths, self.steering, self.gear, self.steering_sign, -self.gear_sign, self.total)
+
+    def reflect(self):
+        """ View of the path with every steering reversed. """
+        return PackedPath(self.lengths, self.steering, self.gear, -self.steering_sign, self.gear_sign, self.total)
+
+    def length(self):
+        """ Total length of the path. """
+        if self.total is None:
+            self.total = sum(self.lengths)
+        return self.total
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def segment(self, i):
+        """ Return segment i as a (param, Steering, Gear) tuple. """
+        return (self.lengths[i],
+                Steering(self.steering[i] * self.steering_sign),
+                Gear(self.gear[i] * self.gear_sign))
+
+    def segments(self):
+        for i in range(len(self.lengths)):
+            yield self.segment(i)
+
+    def __getitem__(self, i):
+        return PathElement(*self.segment(i))
+
+    def __iter__(self):
+        for i in range(len(self.lengths)):
+            yield PathElement(*self.segment(i))
+
+    def to_elements(self):
+        return list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, PackedPath):
+            return list(self.segments()) == list(other.segments())
+        return NotImplemented
+
+    def __repr__(self):
+        return "PackedPath(" + repr(self.to_elements()) + ")"
+
+def as_segments(path):
+    """
+    Iterate a PackedPath or a list of PathElement as (param, Steering, Gear)
+    tuples, without building PathElement objects for packed paths.
+    """
+    if isinstance(path, PackedPath):
+        return path.segments()
+    return ((e.param, e.steering, e.gear) for e in path)
@@ -0,0 +1,80 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import reeds_shepp as rs
+from robot import Robot
+from legs import LegMatrix
+from hybrid_astar import HybridAStar
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+def _init_worker(pillars, collision_index, checker, cancel, hybrid):
+    # Obstacle data is only ever read, each worker simulates on its own robot
+    _worker['robot'] = Robot(0, 0, 0, pillars, collision_index=collision_index, checker=checker)
+    _worker['cancel'] = cancel
+    # Blocked legs are planned in the worker too, with the parent's settings
+    _worker['fallback'] = None if hybrid is None else HybridAStar(_worker['robot'], **hybrid)
+
+def _solve_row(nodes, i):
+    """ Solve the legs leaving nodes[i], stopping between legs once the pool is cancelled. """
+    legs = LegMatrix(_worker['robot'], nodes, solve=False, fallback=_worker['fallback'])
+    for j in range(1, len(nodes)):
+        if _worker['cancel'].is_set():
+            break
+        if i != j:
+            legs.solve_leg(i, j)
+    return i, legs.costs[i], legs.paths[i], legs.solved[i]
+
+def parallel_leg_matrix(robot, nodes, workers=None, fallback=None, deadline=None):
+    """
+    Build the LegMatrix for nodes with one task per row across a pool of
+    worker processes. A HybridAStar fallback (see LegMatrix) is rebuilt in
+    every worker, so blocked legs are planned inside the pool; any other
+    fallback is handed the blocked legs in this process afterwards.
+
+    With a deadline (a time.perf_counter() value), rows still queued then are
+    cancelled and running workers stop before their next leg. Legs left
+    unsolved stay unsolved in the returned matrix, so lazy_costs() solves
+    them on demand.
+    """
+    workers = workers or os.cpu_count() or 1
+    legs = LegMatrix(robot, nodes, solve=False, fallback=fallback)
+    cancel = multiprocessing.Event()
+    hybrid = fallback.settings() if isinstance(fallback, HybridAStar) else None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(robot.pillars, robot.collision_index, robot.checker, cancel, hybrid)) as pool:
+        pending = {pool.submit(_solve_row, legs.nodes, i) for i in range(len(legs.nodes))}
+        while pending:
+            timeout = None if deadline is None or cancel.is_set() else max(deadline - time.perf_counter(), 0)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                i, costs, paths, solved = future.result()
+                legs.costs[i] = costs
+                legs.paths[i] = paths
+                legs.solved[i] = solved
+                legs.solves += sum(1 for j in range(1, len(legs.nodes)) if j != i and solved[j])
+            if not done and not cancel.is_set():
+                # Deadline: drop the queued rows, running ones return what they have
+                cancel.set()
+                for future in pending:
+                    future.cancel()
+
+    if fallback is not None and hybrid is None:
+        for i in range(len(legs.nodes)):
+            for j in range(1, len(legs.nodes)):
+                if i != j and legs.solved[i][j] and legs.paths[i][j] is None:
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        # Leave it to be solved on demand, fallback included
+                        legs.solved[i][j] = False
+                        continue
+                    path = fallback(legs.nodes[i], legs.nodes[j])
+                    if path is not None:
+                        legs.costs[i][j] = rs.path_length(path)
+                        legs.paths[i][j] = path
+
+    return legs
@@ -1,7 +1,10 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 from params import WAYPOINT_DISTANCE, PILLAR_INFLATION
 
+# Variations tried by Pillar.getWaypointCandidates, in cm and degrees
+CANDIDATE_DISTANCES = (0, 10, -5)
+CANDIDATE_SHIFTS = (0, -5, 5)
+CANDIDATE_HEADINGS = (0, -10, 10)
+
 class Pillar:
     def __init__(self, x, y, card_dir, scanned=False):
         assert card_dir in ['N', 'S', 'E', 'W', 'X'], "card_dir must be one of 'N', 'S', 'E', 'W', 'X'"
@@ -13,6 +16,8 @@ class Pillar:
         self.PADDING = PILLAR_INFLATION #! Dangerous, adjust carefully
     
     def draw(self, ax):
+        from matplotlib import patches # Only drawing needs matplotlib
+
         # The actual pillar cell
         pillar_color = 'green' if self.scanned else 'red'
         pillar_rect = patches.Rectangle((self.x, self.y), 10, 10, facecolor=pillar_color)
@@ -43,38 +48,63 @@ class Pillar:
         elif self.card_dir == 'W':
             ax.add_patch(patches.Rectangle((self.x, self.y + 5 - card_size/2), thickness, card_size, facecolor='black'))
 
-    def getWaypoint(self):
+    def getWaypoint(self, card_dir=None, offset_distance=None, lateral=0, heading_offset=0):
+        """
+        Viewing pose facing the card on the card_dir face (default: this
+        pillar's card). offset_distance is measured from the pillar centre,
+        lateral shifts the pose sideways along the face, and heading_offset
+        turns it by that many degrees.
+        """
+        card_dir = card_dir or self.card_dir
+
         # Distance from the center of the pillar to the desired waypoint (pillar radius + robot footprint/2 + distance to snap)
-        offset_distance = 15 + 15 + WAYPOINT_DISTANCE
-        offset_center = 0  # Half the robot's dimension
+        if offset_distance is None:
+            offset_distance = 15 + 15 + WAYPOINT_DISTANCE
+        offset_center = lateral  # Sideways shift along the face
         
         pillar_center_x = self.x + 5  # Center x of the pillar
         pillar_center_y = self.y + 5  # Center y of the pillar
         
-        if self.card_dir == 'N':
-            return (pillar_center_x - offset_center, pillar_center_y + offset_distance, 270)  # Robot is located north of the card and faces south.
-        elif self.card_dir == 'S':
-            return (pillar_center_x + offset_center, pillar_center_y - offset_distance, 90)  # Robot is located south of the card and faces north.
-        elif self.card_dir == 'E':
-            return (pillar_center_x + offset_distance, pillar_center_y + offset_center, 180)  # Robot is located to the east of the card and faces west.
-        elif self.card_dir == 'W':
-            return (pillar_center_x - offset_distance, pillar_center_y - offset_center, 0)    # Robot is located to the west of the card and faces east.
+        if card_dir == 'N':
+            return (pillar_center_x - offset_center, pillar_center_y + offset_distance, (270 + heading_offset) % 360)  # Robot is located north of the card and faces south.
+        elif card_dir == 'S':
+            return (pillar_center_x + offset_center, pillar_center_y - offset_distance, (90 + heading_offset) % 360)  # Robot is located south of the card and faces north.
+        elif card_dir == 'E':
+            return (pillar_center_x + offset_distance, pillar_center_y + offset_center, (180 + heading_offset) % 360)  # Robot is located to the east of the card and faces west.
+        elif card_dir == 'W':
+            return (pillar_center_x - offset_distance, pillar_center_y - offset_center, (0 + heading_offset) % 360)    # Robot is located to the west of the card and faces east.
         
     def getFourWaypoints(self):
-        directions = ['N', 'S', 'E', 'W']
-        waypoints = []
+        return [self.getWaypoint(direction) for direction in ['N', 'S', 'E', 'W']]
 
-        # Temporarily store the original direction
-        original_dir = self.card_dir
-        
-        for direction in directions:
-            self.card_dir = direction
-            waypoints.append(self.getWaypoint())
+    def getWaypointCandidates(self, obstacles=None, distances=CANDIDATE_DISTANCES, shifts=CANDIDATE_SHIFTS,
+                              headings=CANDIDATE_HEADINGS, limit=None):
+        """
+        Alternative viewing poses for this pillar's card, the default waypoint
+        first and the others roughly in order of how far they stray from it:
+        distances are added to the standoff distance, shifts move the pose
+        sideways and headings turn it.
+
+        With obstacles (anything with footprint_blocked(x, y, degrees)), poses
+        where the robot itself would collide are dropped. At most limit poses
+        are returned. Pillars without a card ('X') have none.
+        """
+        if self.card_dir not in ('N', 'S', 'E', 'W'):
+            return []
 
-        # Restore the original direction
-        self.card_dir = original_dir
+        base = 15 + 15 + WAYPOINT_DISTANCE
+        options = [(d, s, h) for d in distances for s in shifts for h in headings]
+        options.sort(key=lambda option: abs(option[0]) + abs(option[1]) + abs(option[2]) / 2)
 
-        return waypoints
+        candidates = []
+        for d, shift, heading in options:
+            pose = self.getWaypoint(offset_distance=base + d, lateral=shift, heading_offset=heading)
+            if obstacles is not None and obstacles.footprint_blocked(*pose):
+                continue
+            candidates.append(pose)
+            if limit is not None and len(candidates) == limit:
+                break
+        return candidates
 
 
 
@@ -0,0 +1,234 @@
+import sys
+import json
+import time
+import argparse
+import reeds_shepp as rs
+from pillars import get_pillars
+from robot import Robot
+from tour import solve_tour, anytime_tour, generalized_held_karp
+from legs import LegMatrix
+from hybrid_astar import HybridAStar
+
+# Headless planning: nothing imported here pulls in matplotlib, drawing stays
+# in shortest_path and the draw methods, which import it when called.
+
+START = (20, 20, 0) # Robot starting position
+POOL_BUDGET_SHARE = 0.5 # Part of an anytime budget the leg solving pool may use, the rest is the tour search's
+
+def iter_tours(robot, waypoints, budget=None, legs=None, fallback=None, workers=None):
+    """
+    Anytime planning: yield (order, final_path, length) for successively
+    shorter collision-free tours, as tour.anytime_tour finds them within
+    budget seconds. Legs are only solved when the search looks at them.
+
+    With workers > 1, a process pool first solves the legs for up to
+    POOL_BUDGET_SHARE of the budget and is cancelled after that; the search
+    solves whatever it left on demand.
+    """
+    start = time.perf_counter()
+    nodes = [(robot.x, robot.y, robot.degrees)] + list(waypoints)
+    if legs is None and workers is not None and workers > 1:
+        from parallel import parallel_leg_matrix # Only pay for multiprocessing when it is used
+        deadline = None if budget is None else start + budget * POOL_BUDGET_SHARE
+        legs = parallel_leg_matrix(robot, nodes, workers, fallback, deadline)
+    elif legs is None:
+        legs = LegMatrix(robot, nodes, solve=False, fallback=fallback)
+    if budget is not None:
+        budget = max(start + budget - time.perf_counter(), 0)
+    for length, order in anytime_tour(legs.lazy_costs(), budget, legs.estimates()):
+        yield [node - 1 for node in order], legs.tour_paths(order), length
+
+def find_best_tour(robot, waypoints, method='held_karp', legs=None, workers=None, budget=None, fallback=None):
+    """
+    Return (order, final_path) for the shortest collision-free tour that starts
+    at the robot's pose and visits every waypoint. order is the visiting order
+    as waypoint indices, final_path the list of Reeds-Shepp paths for each leg.
+    Returns (None, []) if no such tour exists.
+
+    Pass a LegMatrix built for the same arena as legs to reuse its leg solves,
+    or workers > 1 to solve the legs across that many processes. With method
+    'anytime', returns the best tour found within budget seconds instead.
+    fallback, e.g. a HybridAStar, plans the legs no direct path can drive.
+    """
+    if method == 'anytime':
+        best = (None, [])
+        for order, final_path, _ in iter_tours(robot, waypoints, budget, legs, fallback, workers):
+            best = (order, final_path)
+        return best
+
+    nodes = [(robot.x, robot.y, robot.degrees)] + list(waypoints)
+    if legs is None and workers is not None and workers > 1:
+        from parallel import parallel_leg_matrix # Only pay for multiprocessing when it is used
+        legs = parallel_leg_matrix(robot, nodes, workers, fallback)
+    elif legs is None:
+        legs = LegMatrix(robot, nodes, fallback=fallback)
+
+    length, order = solve_tour(legs.costs, method)
+    if order is None:
+        return None, []
+
+    return [node - 1 for node in order], legs.tour_paths(order)
+
+def find_best_candidate_tour(robot, candidate_sets, fallback=None):
+    """
+    Like find_best_tour, but each target has a list of alternative waypoints
+    (e.g. from Pillar.getWaypointCandidates) and the tour may use any one of
+    them. Returns (choices, final_path), where choices lists (target index,
+    waypoint) in visiting order, or (None, []) if no such tour exists.
+    """
+    nodes = [(robot.x, robot.y, robot.degrees)]
+    clusters = []
+    for poses in candidate_sets:
+        if not poses:
+            return None, []
+        clusters.append(list(range(len(nodes), len(nodes) + len(poses))))
+        nodes.extend(poses)
+
+    # Legs are solved on demand, the DP never needs those within a cluster
+    legs = LegMatrix(robot, nodes, solve=False, fallback=fallback)
+    length, order = generalized_held_karp(legs.lazy_costs(), clusters)
+    if order is None:
+        return None, []
+
+    target_of = {node: t for t, cluster in enumerate(clusters) for node in cluster}
+    return [(target_of[node], nodes[node]) for node in order], legs.tour_paths(order)
+
+def maneuvers(path):
+    """ Return a path as a list of JSON-serializable manoeuvre dicts. """
+    return [{'steering': e.steering.name, 'gear': e.gear.name, 'distance': e.param} for e in path]
+
+def build_index(pillars, kind, cache_dir=None):
+    """
+    Build the collision index named kind ('grid' or 'cspace') for pillars.
+    With cache_dir, C-space tables are loaded from and saved to that directory.
+    """
+    if kind == 'grid':
+        from collision_index import OccupancyGrid
+        return OccupancyGrid(pillars)
+    if kind == 'cspace':
+        from cspace import CSpaceTable
+        if cache_dir is not None:
+            return CSpaceTable.load_or_build(pillars, cache_dir)
+        return CSpaceTable(pillars)
+    raise ValueError(f"Unknown collision index {kind!r}, expected 'grid' or 'cspace'")
+
+def plan(pillar_data, start=START, method='held_karp', checker='sampled', collision_index=None, workers=None,
+         budget=None, on_improvement=None, candidates=None, hybrid=False):
+    """
+    Plan the tour for pillar_data, a list of (x, y, card_dir). Returns a dict
+    with the visiting order as pillar indices, the waypoint of each visited
+    pillar, the total length and the manoeuvres of every leg. order is None
+    when there is no collision-free tour. Pillars with card_dir 'X' are only
+    obstacles.
+
+    collision_index is None for exact pillar checks, 'grid' for an
+    OccupancyGrid, 'cspace' for a CSpaceTable, or an index already built for
+    the same pillars.
+
+    With method 'anytime', planning stops after budget seconds, and
+    on_improvement(result) is called with every better tour as it is found.
+
+    With candidates set, each pillar may be viewed from up to that many
+    collision-free poses around its default waypoint, and the tour picks one
+    per pillar (method is then ignored).
+
+    With hybrid set, legs that every direct Reeds-Shepp path collides on are
+    planned with hybrid A* instead of being dropped.
+    """
+    pillars = get_pillars([tuple(p) for p in pillar_data])
+    index = collision_index
+    if isinstance(collision_index, str):
+        index = build_index(pillars, collision_index)
+
+    robot = Robot(start[0], start[1], start[2], pillars, collision_index=index, checker=checker)
+    fallback = HybridAStar(robot) if hybrid else None
+    targets = [i for i, pillar in enumerate(pillars) if pillar.card_dir != 'X']
+    waypoints = [pillars[i].getWaypoint() for i in targets]
+
+    def result(order, final_path, poses=None):
+        """ order holds waypoint indices, poses the pose used for each of them. """
+        if order is None:
+            return {'order': None, 'waypoints': [], 'length': None, 'legs': []}
+        return {
+            'order': [targets[i] for i in order],
+            'waypoints': poses or [waypoints[i] for i in order],
+            'length': sum(rs.path_length(path) for path in final_path),
+            'legs': [maneuvers(path) for path in final_path],
+        }
+
+    if candidates:
+        candidate_sets = [pillars[i].getWaypointCandidates(robot.obstacles(), limit=candidates) for i in targets]
+        choices, final_path = find_best_candidate_tour(robot, candidate_sets, fallback)
+        if choices is None:
+            return result(None, [])
+        return result([i for i, _ in choices], final_path, [pose for _, pose in choices])
+
+    if method == 'anytime':
+        best = result(None, [])
+        for order, final_path, _ in iter_tours(robot, waypoints, budget, fallback=fallback, workers=workers):
+            best = result(order, final_path)
+            if on_improvement is not None:
+                on_improvement(best)
+        return best
+
+    return result(*find_best_tour(robot, waypoints, method, workers=workers, fallback=fallback))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan a tour of the pillars without any plotting.")
+    parser.add_argument('input', nargs='?', help="JSON file with the pillars, default: read stdin. Either a list of "
+                        "[x, y, card_dir] or an object with 'pillars' and optionally 'start': [x, y, degrees]")
+    parser.add_argument('--method', choices=['held_karp', 'branch_and_bound', 'anytime'], default='held_karp')
+    parser.add_argument('--budget', type=float, help="seconds the anytime method may plan for")
+    parser.add_argument('--stream', action='store_true', help="with anytime, print every improved tour as a JSON line")
+    parser.add_argument('--checker', choices=['sampled', 'swept', 'adaptive'], default='sampled')
+    parser.add_argument('--collision-index', choices=['grid', 'cspace'])
+    parser.add_argument('--workers', type=int, help="solve the legs across this many processes, with anytime until half the budget")
+    parser.add_argument('--candidates', type=int, help="let the tour pick among up to this many viewing poses per pillar")
+    parser.add_argument('--hybrid', action='store_true', help="plan legs that no direct path can drive with hybrid A*")
+    parser.add_argument('--report', nargs='?', const='-',
+                        help="write the instrumentation report to this JSON file, or to stderr without a file")
+    parser.add_argument('--profile', help="run under cProfile and write a pstats dump to this file")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        with open(args.input) as f:
+            data = json.load(f)
+    else:
+        data = json.load(sys.stdin)
+    if isinstance(data, list):
+        data = {'pillars': data}
+
+    def stream(result):
+        json.dump(result, sys.stdout)
+        print(flush=True)
+
+    def run():
+        return plan(data['pillars'], tuple(data.get('start', START)), args.method, args.checker,
+                    args.collision_index, args.workers, args.budget, stream if args.stream else None, args.candidates,
+                    args.hybrid)
+
+    if args.profile:
+        from instrumentation import profile # Only loaded when asked for
+        measured = run
+        run = lambda: profile(measured, dump=args.profile)[0]
+    if args.report:
+        from instrumentation import instrumented
+        with instrumented() as session:
+            result = run()
+        if args.report == '-':
+            json.dump(session.report(), sys.stderr, indent=2)
+            print(file=sys.stderr)
+        else:
+            with open(args.report, 'w') as f:
+                json.dump(session.report(), f, indent=2)
+    else:
+        result = run()
+    if args.profile:
+        print(f"Profile written to {args.profile}, view it with: python -m pstats {args.profile}", file=sys.stderr)
+
+    if not args.stream or result['order'] is None:
+        stream(result)
+    return 0 if result['order'] is not None else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import functools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import reeds_shepp as rs
+from pillars import get_pillars
+from planner import START, plan, build_index
+from utils import percentile
+
+# Default arena planned once at startup so the first real request finds the
+# code paths and the common start-pose legs warm
+WARMUP_PILLARS = [(180, 180, 'S'), (20, 170, 'E'), (180, 20, 'W')]
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class PlannerService:
+    """
+    Long-running planner answering JSON requests over localhost HTTP or a Unix
+    socket. The Reeds-Shepp path cache and the collision indexes built for
+    recent layouts stay in memory between requests.
+
+    At most concurrency plans run at once, on a persistent thread pool; up to
+    max_queue more requests wait for a slot, and any beyond that are refused
+    with 503 so a burst cannot pile up unbounded latency.
+    """
+    def __init__(self, concurrency=1, max_queue=32, index_cache_size=16, cache_dir=None):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.index_cache_size = index_cache_size
+        self.cache_dir = cache_dir
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.slots = None # asyncio.Semaphore, created on the serving loop
+        self.indexes = OrderedDict() # (kind, layout) -> collision index, LRU
+        self.index_lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.served = 0
+        self.rejected = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=1000) # Seconds per request, queueing included
+        self.plan_times = deque(maxlen=1000) # Seconds per request spent planning
+
+    def collision_index(self, pillar_data, kind):
+        """ Return the cached collision index of kind for this layout, building it if needed. """
+        key = (kind, tuple(sorted(tuple(p) for p in pillar_data)))
+        with self.index_lock:
+            index = self.indexes.get(key)
+            if index is not None:
+                self.indexes.move_to_end(key)
+                return index
+
+        index = build_index(get_pillars([tuple(p) for p in pillar_data]), kind, self.cache_dir)
+        with self.index_lock:
+            self.indexes[key] = index
+            while len(self.indexes) > self.index_cache_size:
+                self.indexes.popitem(last=False)
+        return index
+
+    def run_plan(self, data):
+        """ Plan one request, in an executor thread. """
+        pillar_data = [tuple(p) for p in data['pillars']]
+        index = data.get('collision_index')
+        if index is not None:
+            index = self.collision_index(pillar_data, index)
+        return plan(pillar_data, tuple(data.get('start', START)), data.get('method', 'held_karp'),
+                    data.get('checker', 'sampled'), index, budget=data.get('budget'),
+                    candidates=data.get('candidates'), hybrid=bool(data.get('hybrid', False)))
+
+    async def handle_plan(self, data):
+        """ Return (status, response dict) for a plan request. """
+        if not isinstance(data, dict) or 'pillars' not in data:
+            return 400, {'error': "expected a JSON object with 'pillars'"}
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            return 503, {'error': 'planner queue is full'}
+
+        received = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, functools.partial(self.run_plan, data))
+        except (AssertionError, KeyError, TypeError, ValueError) as e:
+            # Malformed pillars, e.g. an unknown card_dir
+            self.failed += 1
+            return 400, {'error': str(e) or type(e).__name__}
+        except Exception as e:
+            self.failed += 1
+            print(f"Planning failed: {e!r}")
+            return 500, {'error': repr(e)}
+        finally:
+            self.running -= 1
+            self.slots.release()
+
+        finished = time.perf_counter()
+        self.served += 1
+        self.plan_times.append(finished - started)
+        self.latencies.append(finished - received)
+        result['queue_ms'] = round((started - received) * 1000, 3)
+        result['plan_ms'] = round((finished - started) * 1000, 3)
+        return 200, result
+
+    def metrics(self):
+        """ Request counts, queue state, latency percentiles and cache sizes. """
+        def summary(values):
+            if not values:
+                return None
+            values = list(values)
+            return {'p50_ms': round(percentile(values, 50) * 1000, 3),
+                    'p95_ms': round(percentile(values, 95) * 1000, 3),
+                    'max_ms': round(max(values) * 1000, 3)}
+
+        return {
+            'served': self.served,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'waiting': self.waiting,
+            'running': self.running,
+            'latency': summary(self.latencies),
+            'plan_time': summary(self.plan_times),
+            'path_cache': rs.path_cache.info(),
+            'collision_indexes': len(self.indexes),
+        }
+
+    async def route(self, method, path, body):
+        if method == 'POST' and path == '/plan':
+            try:
+                data = json.loads(body or b'null')
+            except ValueError:
+                return 400, {'error': 'request body is not valid JSON'}
+            return await self.handle_plan(data)
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics()
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        return 404, {'error': f"no route for {method} {path}"}
+
+    async def handle_connection(self, reader, writer):
+        """ Serve HTTP/1.1 requests on one connection until the client closes it. """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # The body cannot be delimited, so the connection cannot be reused
+                    status, response = 400, {'error': 'invalid Content-Length header'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, response = await self.route(method, path, body)
+
+                payload = json.dumps(response).encode()
+                writer.write(f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def warm_up(self):
+        """ Plan the default arena once so imports and common legs are cached. """
+        plan(WARMUP_PILLARS)
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None, warm_up=True):
+        self.slots = asyncio.Semaphore(self.concurrency)
+        if warm_up:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.warm_up)
+
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+            print(f"Planner service listening on {unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print(f"Planner service listening on http://{host}:{port}")
+
+        async with server:
+            await server.serve_forever()
+
+def request(method, path, data=None, host='127.0.0.1', port=8765, unix_path=None, timeout=30):
+    """
+    Minimal blocking client: send one request to a running service and
+    return (status, response dict).
+    """
+    import socket
+    if unix_path is not None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(unix_path)
+    else:
+        sock = socket.create_connection((host, port), timeout)
+
+    body = b'' if data is None else json.dumps(data).encode()
+    with sock:
+        sock.sendall(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+
+    head, _, payload = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    return status, json.loads(payload)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the planner as a long-lived local service.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--concurrency', type=int, default=1, help="plans running at once")
+    parser.add_argument('--max-queue', type=int, default=32, help="requests allowed to wait for a slot")
+    parser.add_argument('--cache-dir', help="directory to persist C-space tables in")
+    parser.add_argument('--no-warm-up', action='store_true')
+    args = parser.parse_args(argv)
+
+    service = PlannerService(args.concurrency, args.max_queue, cache_dir=args.cache_dir)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix, not args.no_warm_up))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,9 @@ from utils import *
 import math
 from enum import Enum
 from dataclasses import dataclass, replace
+from collections import OrderedDict
+import heapq
+import threading
 from pillars import get_pillars
 from params import ARENA_WIDTH, ARENA_HEIGHT, MIN_RADIUS
 
@@ -47,8 +50,13 @@ def boundary_check(x, y):
         return False
     return True
 
-def collision_check(x, y, pillars):
-    """ Check if the robot collides with any of the pillars. """
+def collision_check(x, y, pillars, index=None):
+    """
+    Check if the robot collides with any of the pillars. With a
+    spatial_index.PillarGrid as index, only the nearby pillars are checked.
+    """
+    if index is not None:
+        pillars = index.query_box(x - 30, y - 30, x + 30, y + 30)
     for pillar in pillars:
         # Robot's distance from the pillar's center
         dist = ((x - pillar.x - 5)**2 + (y - pillar.y - 5)**2) ** 0.5
@@ -62,75 +70,190 @@ def path_length(path):
     """
     Return sum of all the segments in the path
     """
+    if hasattr(path, 'length'): # PackedPath
+        return path.length()
     return sum([e.param for e in path])
 
 
-def get_optimal_path(start, end):
+class PathCache:
+    """
+    LRU cache of candidate paths keyed on the quantised relative pose
+    (x, y, theta, radius) that get_all_paths reduces (start, end) to.
+
+    Poses that round to the same multiple of step share an entry, so step
+    trades accuracy for hit rate; the default only merges float noise.
+    """
+    def __init__(self, maxsize=4096, step=1e-6):
+        self.maxsize = maxsize
+        self.step = step
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock() # Planners may share the cache across threads
+
+    def key(self, x, y, theta, r):
+        step = self.step
+        # The path formulas only see theta through sin/cos and M(), so it is periodic
+        return (round(x / step), round(y / step), round((theta % 360) / step), round(r / step))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'step': self.step,
+        }
+
+path_cache = PathCache()
+
+def configure_cache(maxsize=None, step=None):
+    """
+    Resize the path cache or change its quantisation step. Changing the step
+    invalidates every cached entry.
+    """
+    if maxsize is not None:
+        with path_cache.lock:
+            path_cache.maxsize = maxsize
+            while len(path_cache.entries) > maxsize:
+                path_cache.entries.popitem(last=False)
+    if step is not None and step != path_cache.step:
+        path_cache.step = step
+        path_cache.clear()
+
+def get_optimal_path(start, end, r=MIN_RADIUS):
     """
     Return the shortest path from start to end among those that exist
     """
-    paths = get_all_paths(start, end)
-    if not paths:
-        return None
-    
-    min_path = min(paths, key=path_length)
-    print(f"Shortest distance: {path_length(min_path):.2f}")
-
-    return min_path
+    return next(iter_sorted_paths(start, end, r), None)
 
-def get_all_paths(start, end):
+def get_all_paths(start, end, r=MIN_RADIUS):
     """
     Return a list of all the paths from start to end generated by the
-    12 functions and their variants
+    12 functions and their variants, as PackedPath
     """
-    path_fns = [path1, path2, path3, path4, path5, path6,
-                path7, path8, path9, path10, path11, path12]
-    
-    paths = []
-    path_infos = []
+    return list(_cached_candidates(start, end, r).all_paths())
+
+def get_sorted_paths(start, end, r=MIN_RADIUS):
+    """
+    Return a list of all paths from start to end, sorted by their length
+    """
+    return list(_cached_candidates(start, end, r).sorted_paths())
+
+def iter_sorted_paths(start, end, r=MIN_RADIUS):
+    """
+    Yield the paths from start to end in the same order as get_sorted_paths,
+    but lazily: consumers that stop at the first acceptable path never pay for
+    sorting the rest.
+    """
+    candidates = _cached_candidates(start, end, r)
+    if candidates.sorted is not None:
+        yield from candidates.sorted
+        return
+
+    heap = [(path.total, idx) for idx, path in enumerate(candidates.records)]
+    heapq.heapify(heap)
+    while heap:
+        _, idx = heapq.heappop(heap)
+        yield candidates.path(idx)
+
+class Candidates:
+    """
+    The candidate paths for one relative pose, each packed into a PackedPath
+    whose total length is known, so the cache holds a few flat arrays per
+    candidate instead of PathElement objects.
+    """
+    __slots__ = ('records', 'sorted')
+
+    def __init__(self, records):
+        self.records = records
+        self.sorted = None
+
+    def path(self, idx):
+        return self.records[idx]
 
+    def all_paths(self):
+        return list(self.records)
+
+    def sorted_paths(self):
+        if self.sorted is None:
+            # Sort the paths by their length
+            self.sorted = sorted(self.records, key=path_length)
+        return self.sorted
+
+def _cached_candidates(start, end, r):
+    """
+    Return the Candidates for the relative pose of end seen from start,
+    computing them only if the pose is not in the path cache yet.
+    """
     # get coordinates of end in the set of axis where start is (0,0,0)
     x, y, theta = change_of_basis(start, end)
 
-    for idx, get_path in enumerate(path_fns):
-        # get the four variants for each path type, cf article
-        paths_variants = [
-            ("Original", get_path(x, y, theta)),
-            ("Timeflip", timeflip(get_path(-x, y, -theta))),
-            ("Reflect", reflect(get_path(x, -y, -theta))),
-            ("Reflect Timeflip", reflect(timeflip(get_path(-x, -y, theta))))
-        ]
+    key = path_cache.key(x, y, theta, r)
+    entry = path_cache.get(key)
+    if entry is None:
+        entry = Candidates(_candidate_records(x, y, theta, r))
+        path_cache.put(key, entry)
 
-        for variant_name, variant_path in paths_variants:
-            # for e in variant_path:
-                # print(type(e), e)
+    return entry
 
-            # Remove path elements that have parameter 0
-            variant_path = list(filter(lambda e: e.param != 0, variant_path))
-            
-            if not variant_path:
-                path_infos.append(f"Path {idx + 1}, {variant_name}: Invalid")
-            else:
-                length = path_length(variant_path)
-                path_infos.append(f"Path {idx + 1}, {variant_name}: Length = {length:.2f}")
-                paths.append(variant_path)
-    
-    # print("\nAll Path Infos:")
-    # for info in path_infos:
-    #     print(info)
-
-    return paths
-
-def get_sorted_paths(start, end):
+def _segment(param, steering, gear):
+    return (param, steering, gear)
+
+def _candidate_records(x, y, theta, r):
     """
-    Return a list of all paths from start to end, sorted by their length
+    Return the candidate PackedPaths for the relative pose (x, y, theta), in
+    the order of the 12 functions and their variants, skipping invalid ones
     """
-    paths = get_all_paths(start, end)
-    
-    # Sort the paths by their length
-    sorted_paths = sorted(paths, key=path_length)
+    from packed_path import PackedPath # packed_path imports this module
+    path_fns = [path1, path2, path3, path4, path5, path6,
+                path7, path8, path9, path10, path11, path12]
+
+    records = []
+
+    for get_path in path_fns:
+        # get the four variants for each path type, cf article:
+        # original, timeflip, reflect and reflect timeflip
+        paths_variants = [
+            (get_path(x, y, theta, r, _segment), 1, 1),
+            (get_path(-x, y, -theta, r, _segment), -1, 1),
+            (get_path(x, -y, -theta, r, _segment), 1, -1),
+            (get_path(-x, -y, theta, r, _segment), -1, -1)
+        ]
+
+        for segments, gear_sign, steering_sign in paths_variants:
+            # Remove path elements that have parameter 0
+            segments = [e for e in segments if e[0] != 0]
+            if segments:
+                length = sum([abs(e[0]) for e in segments])
+                records.append(PackedPath.from_segments(segments, steering_sign, gear_sign, length))
 
-    return sorted_paths
+    return records
 
 def timeflip(path):
     """
@@ -147,7 +270,7 @@ def reflect(path):
     new_path = [e.reverse_steering() for e in path]
     return new_path
 
-def path1(x, y, phi, r=MIN_RADIUS):
+def path1(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.1: CSC (same turns)
     """
@@ -158,18 +281,18 @@ def path1(x, y, phi, r=MIN_RADIUS):
 
     v = M(phi - t)
 
-    # Calculate lengths for each segment
-    length_t = abs(r * t)  # length of the first circular segment
+    # Calculate lengths for each segment, negative lengths are driven in reverse
+    length_t = r * t  # length of the first circular segment
     length_u = u  # length of the straight segment
-    length_v = abs(r * v)  # length of the second circular segment
+    length_v = r * v  # length of the second circular segment
 
-    path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-    path.append(PathElement.create(length_u, Steering.STRAIGHT, Gear.FORWARD))
-    path.append(PathElement.create(length_v, Steering.LEFT, Gear.FORWARD))
+    path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+    path.append(create(length_u, Steering.STRAIGHT, Gear.FORWARD))
+    path.append(create(length_v, Steering.LEFT, Gear.FORWARD))
 
     return path
 
-def path2(x, y, phi, r=MIN_RADIUS):
+def path2(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.2: CSC (opposite turns)
     """
@@ -187,13 +310,13 @@ def path2(x, y, phi, r=MIN_RADIUS):
         length_u = u
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.STRAIGHT, Gear.FORWARD))
-        path.append(PathElement.create(length_v, Steering.RIGHT, Gear.FORWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.STRAIGHT, Gear.FORWARD))
+        path.append(create(length_v, Steering.RIGHT, Gear.FORWARD))
 
     return path
 
-def path3(x, y, phi, r=MIN_RADIUS):
+def path3(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.3: C|C|C
     """
@@ -214,13 +337,13 @@ def path3(x, y, phi, r=MIN_RADIUS):
         length_u = u * r
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_v, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_v, Steering.LEFT, Gear.FORWARD))
 
     return path
 
-def path4(x, y, phi, r=MIN_RADIUS):
+def path4(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.4 (1): C|CC
     """
@@ -241,13 +364,13 @@ def path4(x, y, phi, r=MIN_RADIUS):
         length_u = u * r
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_v, Steering.LEFT, Gear.BACKWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_v, Steering.LEFT, Gear.BACKWARD))
 
     return path
 
-def path5(x, y, phi, r=MIN_RADIUS):
+def path5(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.4 (2): CC|C
     """
@@ -258,9 +381,9 @@ def path5(x, y, phi, r=MIN_RADIUS):
     eta = y - r + r * math.cos(phi)
     rho, theta = R(xi, eta)
 
-    if rho <= 4 * r:
+    if 0 < rho <= 4 * r:
         u = math.acos(1 - rho*rho/(8 * r * r))
-        A = math.asin(2 * r * math.sin(u) / rho)
+        A = math.asin(min(1, 2 * r * math.sin(u) / rho)) # Rounding can push it past 1 for tiny rho
         t = M(theta + math.pi/2 - A)
         v = M(t - u - phi)
 
@@ -268,13 +391,13 @@ def path5(x, y, phi, r=MIN_RADIUS):
         length_u = u * r
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.RIGHT, Gear.FORWARD))
-        path.append(PathElement.create(length_v, Steering.LEFT, Gear.BACKWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.RIGHT, Gear.FORWARD))
+        path.append(create(length_v, Steering.LEFT, Gear.BACKWARD))
 
     return path
 
-def path6(x, y, phi, r=MIN_RADIUS):
+def path6(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.7: CCu|CuC
     """
@@ -301,14 +424,14 @@ def path6(x, y, phi, r=MIN_RADIUS):
         length_u = u * r
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.RIGHT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.LEFT, Gear.BACKWARD))  # Note that 'u' is used again here
-        path.append(PathElement.create(length_v, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.RIGHT, Gear.FORWARD))
+        path.append(create(length_u, Steering.LEFT, Gear.BACKWARD))  # Note that 'u' is used again here
+        path.append(create(length_v, Steering.RIGHT, Gear.BACKWARD))
 
     return path
 
-def path7(x, y, phi, r=MIN_RADIUS):
+def path7(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.8: C|CuCu|C
     """
@@ -330,14 +453,14 @@ def path7(x, y, phi, r=MIN_RADIUS):
         length_u = u * r
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_u, Steering.LEFT, Gear.BACKWARD))  # Note that 'u' is used again here
-        path.append(PathElement.create(length_v, Steering.RIGHT, Gear.FORWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_u, Steering.LEFT, Gear.BACKWARD))  # Note that 'u' is used again here
+        path.append(create(length_v, Steering.RIGHT, Gear.FORWARD))
 
     return path
 
-def path8(x, y, phi, r=MIN_RADIUS):
+def path8(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.9 (1): C|C[pi/2]SC
     """
@@ -358,14 +481,14 @@ def path8(x, y, phi, r=MIN_RADIUS):
         length_u = u  
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2 * r, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_u, Steering.STRAIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_v, Steering.LEFT, Gear.BACKWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(math.pi/2 * r, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_u, Steering.STRAIGHT, Gear.BACKWARD))
+        path.append(create(length_v, Steering.LEFT, Gear.BACKWARD))
 
     return path
 
-def path9(x, y, phi, r=MIN_RADIUS):
+def path9(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.9 (2): CSC[pi/2]|C
     """
@@ -386,14 +509,14 @@ def path9(x, y, phi, r=MIN_RADIUS):
         length_u = u  
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.STRAIGHT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2 * r, Steering.RIGHT, Gear.FORWARD))
-        path.append(PathElement.create(length_v, Steering.LEFT, Gear.BACKWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.STRAIGHT, Gear.FORWARD))
+        path.append(create(math.pi/2 * r, Steering.RIGHT, Gear.FORWARD))
+        path.append(create(length_v, Steering.LEFT, Gear.BACKWARD))
 
     return path
 
-def path10(x, y, phi, r=MIN_RADIUS):
+def path10(x, y, phi, r=MIN_RADIUS, create=PathElement.create):
     """
     Formula 8.10 (1): C|C[pi/2]SC
     """
@@ -413,14 +536,14 @@ def path10(x, y, phi, r=MIN_RADIUS):
         length_u = u 
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2 * r, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_u, Steering.STRAIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_v, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(math.pi/2 * r, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_u, Steering.STRAIGHT, Gear.BACKWARD))
+        path.append(create(length_v, Steering.RIGHT, Gear.BACKWARD))
 
     return path
 
-def path11(x, y, phi, r=MIN_RADIUS): 
+def path11(x, y, phi, r=MIN_RADIUS, create=PathElement.create): 
     """
     Formula 8.10 (2): CSC[pi/2]|C
     """
@@ -440,14 +563,14 @@ def path11(x, y, phi, r=MIN_RADIUS):
         length_u = u  
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_u, Steering.STRAIGHT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2 * r, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(length_v, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_u, Steering.STRAIGHT, Gear.FORWARD))
+        path.append(create(math.pi/2 * r, Steering.LEFT, Gear.FORWARD))
+        path.append(create(length_v, Steering.RIGHT, Gear.BACKWARD))
 
     return path
 
-def path12(x, y, phi, r=MIN_RADIUS): 
+def path12(x, y, phi, r=MIN_RADIUS, create=PathElement.create): 
     """
     Formula 8.11: C|C[pi/2]SC[pi/2]|C
     """
@@ -468,11 +591,11 @@ def path12(x, y, phi, r=MIN_RADIUS):
         length_u = u  
         length_v = v * r
 
-        path.append(PathElement.create(length_t, Steering.LEFT, Gear.FORWARD))
-        path.append(PathElement.create(math.pi/2 * r, Steering.RIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(length_u, Steering.STRAIGHT, Gear.BACKWARD))
-        path.append(PathElement.create(math.pi/2 * r, Steering.LEFT, Gear.BACKWARD))
-        path.append(PathElement.create(length_v, Steering.RIGHT, Gear.FORWARD))
+        path.append(create(length_t, Steering.LEFT, Gear.FORWARD))
+        path.append(create(math.pi/2 * r, Steering.RIGHT, Gear.BACKWARD))
+        path.append(create(length_u, Steering.STRAIGHT, Gear.BACKWARD))
+        path.append(create(math.pi/2 * r, Steering.LEFT, Gear.BACKWARD))
+        path.append(create(length_v, Steering.RIGHT, Gear.FORWARD))
 
     return path
 
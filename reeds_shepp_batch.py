@@ -0,0 +1,258 @@
+import numpy as np
+from reeds_shepp import PathElement, Steering, Gear
+from params import MIN_RADIUS
+
+# Every candidate has at most 5 segments, and there are 12 families x 4 variants
+MAX_SEGMENTS = 5
+NUM_CANDIDATES = 48
+
+L, S, R = Steering.LEFT.value, Steering.STRAIGHT.value, Steering.RIGHT.value
+F, B = Gear.FORWARD.value, Gear.BACKWARD.value
+
+def M(theta):
+    """
+    Vectorised utils.M: wrap angles (radians) to [-pi, pi).
+    """
+    theta = np.mod(theta, 2 * np.pi)
+    return np.where(theta >= np.pi, theta - 2 * np.pi, theta)
+
+def R_(x, y):
+    """
+    Vectorised utils.R: polar coordinates (r, theta) of the points (x, y).
+    """
+    return np.hypot(x, y), np.arctan2(y, x)
+
+def change_of_basis(starts, ends):
+    """
+    Vectorised utils.change_of_basis over (N, 3) arrays of poses in degrees.
+    """
+    theta1 = np.deg2rad(starts[:, 2])
+    dx = ends[:, 0] - starts[:, 0]
+    dy = ends[:, 1] - starts[:, 1]
+    new_x = dx * np.cos(theta1) + dy * np.sin(theta1)
+    new_y = -dx * np.sin(theta1) + dy * np.cos(theta1)
+    new_theta = ends[:, 2] - starts[:, 2]
+    return new_x, new_y, new_theta
+
+def _left_circle(x, y, phi, r):
+    # xi and eta used by formulas 8.1, 8.3, 8.4 and 8.9
+    return R_(x - r * np.sin(phi), y - r + r * np.cos(phi))
+
+def _right_circle(x, y, phi, r):
+    # xi and eta used by formulas 8.2, 8.7, 8.8, 8.10 and 8.11
+    return R_(x + r * np.sin(phi), y - r - r * np.cos(phi))
+
+# Each family mirrors reeds_shepp.pathN and returns (params, steering, gear, valid),
+# where params is a list of signed segment lengths, steering/gear the base codes
+# for each segment and valid a boolean mask of the poses the formula applies to.
+
+def path1(x, y, phi, r):
+    u, t = _left_circle(x, y, phi, r)
+    v = M(phi - t)
+    valid = np.ones_like(x, dtype=bool)
+    return [r * t, u, r * v], [L, S, L], [F, F, F], valid
+
+def path2(x, y, phi, r):
+    phi = M(phi)
+    rho, t1 = _right_circle(x, y, phi, r)
+    valid = rho * rho >= 4 * r * r
+    u = np.sqrt(np.where(valid, rho * rho - 4 * r * r, 0))
+    t = M(t1 + np.arctan2(2 * r, u))
+    v = M(t - phi)
+    return [t * r, u, v * r], [L, S, R], [F, F, F], valid
+
+def _path3_4(x, y, phi, r):
+    rho, theta = _left_circle(x, y, phi, r)
+    valid = rho <= 4 * r
+    A = np.arccos(np.where(valid, rho / (4 * r), 0))
+    t = M(theta + np.pi / 2 + A)
+    u = M(np.pi - 2 * A)
+    return t, u, valid
+
+def path3(x, y, phi, r):
+    t, u, valid = _path3_4(x, y, phi, r)
+    v = M(phi - t - u)
+    return [t * r, u * r, v * r], [L, R, L], [F, B, F], valid
+
+def path4(x, y, phi, r):
+    t, u, valid = _path3_4(x, y, phi, r)
+    v = M(t + u - phi)
+    return [t * r, u * r, v * r], [L, R, L], [F, B, B], valid
+
+def path5(x, y, phi, r):
+    rho, theta = _left_circle(x, y, phi, r)
+    valid = (rho > 0) & (rho <= 4 * r)
+    u = np.arccos(np.where(valid, 1 - rho * rho / (8 * r * r), 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        A = np.arcsin(np.minimum(1, 2 * r * np.sin(u) / rho))
+    valid &= np.isfinite(A)
+    t = M(theta + np.pi / 2 - A)
+    v = M(t - u - phi)
+    return [t * r, u * r, v * r], [L, R, L], [F, F, B], valid
+
+def path6(x, y, phi, r):
+    rho, theta = _right_circle(x, y, phi, r)
+    valid = rho <= 4 * r
+    inner = rho <= 2 * r
+    A = np.arccos(np.clip(np.where(inner, rho + 2 * r, rho - 2 * r) / (4 * r), -1, 1))
+    t = M(theta + np.pi / 2 + np.where(inner, A, -A))
+    u = M(np.where(inner, A, np.pi - A))
+    v = M(phi - t + 2 * u)
+    return [t * r, u * r, u * r, v * r], [L, R, L, R], [F, F, B, B], valid
+
+def path7(x, y, phi, r):
+    rho, theta = _right_circle(x, y, phi, r)
+    u1 = (20 * r * r - rho * rho) / (16 * r * r)
+    valid = (rho <= 6 * r) & (0 <= u1) & (u1 <= 1)
+    u = np.arccos(np.clip(u1, -1, 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        A = np.arcsin(2 * r * np.sin(u) / rho)
+    valid &= np.isfinite(A)
+    t = M(theta + np.pi / 2 + A)
+    v = M(t - phi)
+    return [t * r, u * r, u * r, v * r], [L, R, L, R], [F, B, B, F], valid
+
+def path8(x, y, phi, r):
+    rho, theta = _left_circle(x, y, phi, r)
+    valid = rho >= 2 * r
+    u = np.sqrt(np.where(valid, rho * rho - 4 * r * r, 0)) - 2 * r
+    A = np.arctan2(2 * r, u + 2 * r)
+    t = M(theta + np.pi / 2 + A)
+    v = M(t - phi + np.pi / 2)
+    quarter = np.full_like(x, np.pi / 2 * r)
+    return [t * r, quarter, u, v * r], [L, R, S, L], [F, B, B, B], valid
+
+def path9(x, y, phi, r):
+    rho, theta = _left_circle(x, y, phi, r)
+    valid = rho >= 2 * r
+    u = np.sqrt(np.where(valid, rho * rho - 4 * r * r, 0)) - 2 * r
+    A = np.arctan2(u + 2 * r, 2 * r)
+    t = M(theta + np.pi / 2 - A)
+    v = M(t - phi - np.pi / 2)
+    quarter = np.full_like(x, np.pi / 2 * r)
+    return [t * r, u, quarter, v * r], [L, S, R, L], [F, F, F, B], valid
+
+def path10(x, y, phi, r):
+    rho, theta = _right_circle(x, y, phi, r)
+    valid = rho >= 2 * r
+    t = M(theta + np.pi / 2)
+    u = rho - 2 * r
+    v = M(phi - t - np.pi / 2)
+    quarter = np.full_like(x, np.pi / 2 * r)
+    return [t * r, quarter, u, v * r], [L, R, S, R], [F, B, B, B], valid
+
+def path11(x, y, phi, r):
+    rho, theta = _right_circle(x, y, phi, r)
+    valid = rho >= 2 * r
+    t = M(theta)
+    u = rho - 2 * r
+    v = M(phi - t - np.pi / 2)
+    quarter = np.full_like(x, np.pi / 2 * r)
+    return [t * r, u, quarter, v * r], [L, S, L, R], [F, F, F, B], valid
+
+def path12(x, y, phi, r):
+    rho, theta = _right_circle(x, y, phi, r)
+    valid = rho >= 4 * r
+    u = np.sqrt(np.where(valid, rho * rho - 4 * r * r, 0)) - 4 * r
+    A = np.arctan2(2 * r, u + 4 * r)
+    t = M(theta + np.pi / 2 + A)
+    v = M(t - phi)
+    quarter = np.full_like(x, np.pi / 2 * r)
+    return [t * r, quarter, u, quarter, v * r], [L, R, S, L, R], [F, B, B, B, F], valid
+
+PATH_FNS = [path1, path2, path3, path4, path5, path6,
+            path7, path8, path9, path10, path11, path12]
+
+def get_all_paths_relative_batch(x, y, theta, r=MIN_RADIUS):
+    """
+    Evaluate all 12 families and their 4 variants for arrays of relative poses
+    (x, y, theta in degrees), as returned by change_of_basis.
+
+    Returns (lengths, steering, gear, valid):
+    - lengths: (N, 48, 5) float array of segment lengths, 0 for unused segments
+    - steering, gear: (N, 48, 5) int8 arrays of Steering/Gear values, gear is
+      0 for unused segments
+    - valid: (N, 48) bool mask of the candidates that exist
+
+    Candidate k is variant k % 4 (original, timeflip, reflect, reflect
+    timeflip) of family k // 4 + 1, the order get_all_paths tries them in.
+    Poses where an asin/acos argument falls outside its domain just mark
+    that candidate invalid instead of raising.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    phi = np.deg2rad(np.asarray(theta, dtype=float))
+    n = x.shape[0]
+
+    lengths = np.zeros((n, NUM_CANDIDATES, MAX_SEGMENTS))
+    steering = np.zeros((n, NUM_CANDIDATES, MAX_SEGMENTS), dtype=np.int8)
+    gear = np.zeros((n, NUM_CANDIDATES, MAX_SEGMENTS), dtype=np.int8)
+    valid = np.zeros((n, NUM_CANDIDATES), dtype=bool)
+
+    # (x, y, phi) fed to the formula, and the gear/steering sign of each variant
+    variants = [
+        (x, y, phi, 1, 1),      # Original
+        (-x, y, -phi, -1, 1),   # Timeflip
+        (x, -y, -phi, 1, -1),   # Reflect
+        (-x, -y, phi, -1, -1),  # Reflect Timeflip
+    ]
+
+    with np.errstate(invalid='ignore'):
+        for family, path_fn in enumerate(PATH_FNS):
+            for variant, (vx, vy, vphi, gear_sign, steering_sign) in enumerate(variants):
+                k = 4 * family + variant
+                params, base_steering, base_gear, ok = path_fn(vx, vy, vphi, r)
+
+                for i, param in enumerate(params):
+                    # PathElement.create turns negative lengths into the opposite gear
+                    flip = np.where(param < 0, -1, 1)
+                    lengths[:, k, i] = np.abs(param)
+                    steering[:, k, i] = steering_sign * base_steering[i]
+                    gear[:, k, i] = gear_sign * base_gear[i] * flip
+
+                segments = lengths[:, k, :len(params)]
+                ok = ok & np.all(np.isfinite(segments), axis=1) & np.any(segments != 0, axis=1)
+                valid[:, k] = ok
+
+    # Keep invalid candidates inert
+    lengths[~valid] = 0
+    gear[~valid] = 0
+    return lengths, steering, gear, valid
+
+def get_all_paths_batch(starts, ends, r=MIN_RADIUS):
+    """
+    Batch get_all_paths for (N, 3) arrays of start and end poses (x, y, degrees).
+    See get_all_paths_relative_batch for the returned arrays.
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+    x, y, theta = change_of_basis(starts, ends)
+    return get_all_paths_relative_batch(x, y, theta, r)
+
+def path_lengths_batch(lengths, valid):
+    """
+    Return the (N, 48) total length of each candidate, inf where it is invalid.
+    """
+    return np.where(valid, lengths.sum(axis=2), np.inf)
+
+def optimal_lengths_batch(starts, ends, r=MIN_RADIUS):
+    """
+    Return (lengths, indices): the shortest candidate length for each pair of
+    poses and which of the 48 candidates it is. Pairs without any candidate
+    get an infinite length.
+    """
+    lengths, _, _, valid = get_all_paths_batch(starts, ends, r)
+    totals = path_lengths_batch(lengths, valid)
+    indices = np.argmin(totals, axis=1)
+    return totals[np.arange(totals.shape[0]), indices], indices
+
+def to_path(lengths, steering, gear, n, k):
+    """
+    Return candidate k of pose pair n as a list of PathElement, dropping
+    zero-length segments like get_all_paths does. None if it is invalid.
+    """
+    path = []
+    for param, steer, g in zip(lengths[n, k], steering[n, k], gear[n, k]):
+        if g != 0 and param != 0:
+            path.append(PathElement(float(param), Steering(int(steer)), Gear(int(g))))
+    return path or None
@@ -1,26 +1,33 @@
 import math
 from utils import rad2deg
-from matplotlib import patches
-import matplotlib.pyplot as plt
 from reeds_shepp import Steering, Gear
 from pillars import get_pillars
-from params import ARENA_WIDTH, ARENA_HEIGHT, ROBOT_ACTUAL_WIDTH, ROBOT_ACTUAL_LENGTH, ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT, MIN_RADIUS
+import swept
+from adaptive_sampler import AdaptiveSampler
+from validation import Pose, PillarObstacles, validate_path
+from packed_path import PackedPath
+from params import ROBOT_ACTUAL_WIDTH, ROBOT_ACTUAL_LENGTH, ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT, MIN_RADIUS
 
 class Robot:
-    def __init__(self, x, y, degrees, pillars, color='lightblue'):
+    def __init__(self, x, y, degrees, pillars, color='lightblue', collision_index=None, checker='sampled'):
         self.x = x
         self.y = y
         self.degrees = degrees # 0 degrees is facing right, 90 degrees is facing up, etc.
         self.pillars = pillars
+        self.pillar_obstacles = PillarObstacles(pillars)
+        self.pillar_index = self.pillar_obstacles.index # Broad phase for the pillar checks
         self.color = color
+        self.collision_index = collision_index # e.g. an OccupancyGrid built from the same pillars
+        self.checker = checker # How simulate_reeds_shepps_path checks a path: 'sampled', 'swept' or 'adaptive'
+        self.sampler = None # AdaptiveSampler, created on first use
     
         self.min_radius = MIN_RADIUS
-        self.sim_x = x
-        self.sim_y = y
-        self.sim_degrees = degrees
 
     def draw_arc(self, radius, angle_deg, color='green'):
         """Draws an arc with given radius and angle."""
+        import matplotlib.pyplot as plt
+        from matplotlib import patches
+
         if radius > 0: # Left turn
             circle_x, circle_y = self.get_left_circle_center(self.x, self.y)
             start_angle = self.degrees - 90
@@ -47,6 +54,13 @@ class Robot:
         self.y -= radius * (math.cos(math.radians(self.degrees)) - math.cos(math.radians(self.degrees - angle_deg)))
 
     def execute_maneuver(self, e):
+        if isinstance(e, PackedPath):
+            for element in e:
+                self.execute_maneuver(element)
+            return
+
+        import matplotlib.pyplot as plt # Drawing only, planning never imports matplotlib
+
         # print(f"Executing maneuver - Steering: {e.steering}, Gear: {e.gear}, Param: {e.param}")
         color = 'green' if e.gear == Gear.FORWARD else 'red'
 
@@ -70,6 +84,8 @@ class Robot:
             self.y += dy
 
     def follow_reeds_shepps(self, path):
+        if isinstance(path, PackedPath):
+            path = [path]
         for subpath in path:
             for e in subpath:
                 self.execute_maneuver(e)
@@ -104,6 +120,9 @@ class Robot:
                                       self.min_radius, self.degrees)
 
     def draw_robot(self, x, y, degrees, color):
+        import matplotlib.pyplot as plt
+        from matplotlib import patches
+
         # Variables to adjust the robot's actual representation based on orientation
         robot_width, robot_length = ROBOT_ACTUAL_WIDTH, ROBOT_ACTUAL_LENGTH
         
@@ -161,6 +180,9 @@ class Robot:
 
 
     def draw_turning_circles(self, x, y, min_radius, degrees):
+        import matplotlib.pyplot as plt
+        from matplotlib import patches
+
         # Calculate turning circle centers assuming 0-degree orientation
         left_circle_x = x
         left_circle_y = y + self.min_radius
@@ -184,128 +206,32 @@ class Robot:
         Simulate the robot's movement along the given path to check for collisions
         without actually drawing it. Returns True if a collision is detected, 
         and False otherwise.
+
+        The 'sampled' checker goes through validation.validate_path and does
+        not modify the robot, so it is safe to call from several threads.
         """
-        # print(f"Simulating Reeds-Shepp Path...")
-        # print(f"Simulation started at ({start_x}, {start_y}, {start_degrees})")
-        temp_x, temp_y, temp_degrees = start_x, start_y, start_degrees
-
-        for e in path:
-            # print(f"Simulating maneuver - Steering: {e.steering}, Gear: {e.gear}, Param: {e.param}")
-
-            # Divide each segment into checkpoints to monitor for collisions
-            check_points = [e.param / 4, e.param / 2, 3 * e.param / 4, e.param]
-
-            # Initialize previous checkpoint for interval calculation
-            prev_checkpoint = 0
-
-            for checkpoint in check_points:
-                interval = checkpoint - prev_checkpoint
-                prev_checkpoint = checkpoint
-
-                # Calculate robot's movement for the current element but don't draw it
-                dx, dy, d_angle = 0, 0, 0
-
-                if e.steering == Steering.LEFT:
-                    radius = self.min_radius
-                    d_angle = rad2deg(interval / self.min_radius)
-                    if e.gear == Gear.BACKWARD:
-                        d_angle = -d_angle
-
-                elif e.steering == Steering.RIGHT:
-                    radius = -self.min_radius
-                    d_angle = rad2deg(interval / self.min_radius)
-                    if e.gear == Gear.FORWARD:
-                        d_angle = -d_angle
-
-                elif e.steering == Steering.STRAIGHT:
-                    dx = (1 if e.gear == Gear.FORWARD else -1) * interval * math.cos(math.radians(temp_degrees))
-                    dy = (1 if e.gear == Gear.FORWARD else -1) * interval * math.sin(math.radians(temp_degrees))
-
-                # Apply the changes
-                temp_degrees += d_angle
-                temp_degrees = temp_degrees % 360  # Ensure degree is in [0, 360)
-                if e.steering in [Steering.LEFT, Steering.RIGHT]:
-                    angle_before = temp_degrees - d_angle
-                    dx = radius * (math.sin(math.radians(temp_degrees)) - math.sin(math.radians(angle_before)))
-                    dy = -radius * (math.cos(math.radians(temp_degrees)) - math.cos(math.radians(angle_before)))
-                temp_x += dx
-                temp_y += dy
-
-                # Check for collision
-                if self.collision_detected(temp_x, temp_y, temp_degrees):
-                    # print("Collision detected.")
-                    return True, None, None, None
-
-                # print(f"Checkpoint at Param {checkpoint}: Robot Position: ({temp_x}, {temp_y}, {temp_degrees})")
-
-        return False, temp_x, temp_y, temp_degrees
-
-    def calculate_footprint_corners(self, x, y, degrees):
-        # Corners when the robot is facing right (0 degrees)
-        bl = (x, y)
-        br = (x + ROBOT_FOOTPRINT_WIDTH, y)
-        tr = (x + ROBOT_FOOTPRINT_WIDTH, y + ROBOT_FOOTPRINT_HEIGHT)
-        tl = (x, y + ROBOT_FOOTPRINT_HEIGHT)
-
-        # print(f"Before Rotation: ({bl}, {br}, {tr}, {tl})")
-
-        # Rotate the corners based on the given degrees around (x, y)
-        bl_rot = self.rotate_point(bl[0], bl[1], x, y, degrees)
-        br_rot = self.rotate_point(br[0], br[1], x, y, degrees)
-        tr_rot = self.rotate_point(tr[0], tr[1], x, y, degrees)
-        tl_rot = self.rotate_point(tl[0], tl[1], x, y, degrees)
-
-        # print(f"After Rotation: ({bl_rot}, {br_rot}, {tr_rot}, {tl_rot})")
-        
-        return [bl_rot, br_rot, tr_rot, tl_rot]
-
-    # Check if a point is within a pillar's collision zone
-    def pillar_collision(self, x, y, pillar):
-        # Define pillar collision zone boundary
-        # 10 and 20 because true coord is bottom left corner of the pillar
-        x_min = pillar.x - pillar.PADDING
-        x_max = pillar.x + pillar.PADDING + 10
-        y_min = pillar.y - pillar.PADDING
-        y_max = pillar.y + pillar.PADDING + 10
-
-        # print(f"Checking if ({x}, {y}) is within ({x_min}, {y_min}) and ({x_max}, {y_max})")
-        
-        # Check if the point lies within the boundary
-        if x_min < x < x_max and y_min < y < y_max:
-            return True
-        return False
+        if self.checker == 'swept':
+            return swept.check_path(path, start_x, start_y, start_degrees, self.pillars, self.min_radius, self.pillar_index)
+        if self.checker == 'adaptive':
+            if self.sampler is None:
+                # Reuse the collision index's distance field if it has one
+                grid = self.collision_index if hasattr(self.collision_index, 'clearance') else None
+                self.sampler = AdaptiveSampler(self.pillars, self.collision_detected, grid, r=self.min_radius)
+            return self.sampler.check_path(path, start_x, start_y, start_degrees)
+
+        ok, end_pose, _ = validate_path(Pose(start_x, start_y, start_degrees), path, self.obstacles(), self.min_radius)
+        if not ok:
+            return True, None, None, None
+        return False, end_pose.x, end_pose.y, end_pose.degrees
+
+    def obstacles(self):
+        """
+        Return the read-only obstacle index used for collision checks: the
+        collision index if one was given, otherwise an exact pillar test.
+        """
+        if self.collision_index is not None:
+            return self.collision_index
+        return self.pillar_obstacles
 
     def collision_detected(self, x, y, degrees):
-        corners = self.calculate_footprint_corners(x, y, degrees)
-        # print(f"Robot Footprint Corners: {corners}")
-
-        # Create edge midpoints based on the corners
-        edge_midpoints = [
-            ((corners[0][0] + corners[1][0]) / 2, (corners[0][1] + corners[1][1]) / 2),  # top edge
-            ((corners[1][0] + corners[2][0]) / 2, (corners[1][1] + corners[2][1]) / 2),  # right edge
-            ((corners[2][0] + corners[3][0]) / 2, (corners[2][1] + corners[3][1]) / 2),  # bottom edge
-            ((corners[3][0] + corners[0][0]) / 2, (corners[3][1] + corners[0][1]) / 2)   # left edge
-        ]
-
-        points_to_check = corners + edge_midpoints
-        # print(f"Points to Check: {points_to_check}")
-
-        PADDING = 10
-            
-        # Check each point against the arena boundary
-        for px, py in points_to_check:
-            if px < 0 - PADDING or px > ARENA_WIDTH + PADDING or py < 0 - PADDING or py > ARENA_HEIGHT + PADDING:
-                # print(f"Robot Position: ({x}, {y}, {degrees})")
-                # print(f"Boundary Collision at Point: ({px}, {py})")
-                return True
-            
-        # Check for pillar collisions
-        for pillar in self.pillars:
-            for px, py in points_to_check:
-                if self.pillar_collision(px, py, pillar):
-                    # print(f"Robot Position: ({x}, {y}, {degrees})")
-                    # print(f"Pillar Collision at Point: ({px}, {py}) with Pillar at ({pillar.x}, {pillar.y})")
-                    return True
-            
-        return False
-        
\ No newline at end of file
+        return self.obstacles().footprint_blocked(x, y, degrees)
@@ -0,0 +1,209 @@
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import numpy as np
+import reeds_shepp as rs
+import reeds_shepp_batch as rb
+from utils import change_of_basis
+from params import ARENA_WIDTH, ARENA_HEIGHT, MIN_RADIUS
+
+# Relative poses between any two poses in the arena are within this distance
+DEFAULT_EXTENT = math.ceil(math.hypot(ARENA_WIDTH, ARENA_HEIGHT))
+# Relative poses closer than this many turning radii are solved exactly: the
+# length changes too sharply there for the grid (tens of cm off within r)
+EXACT_WITHIN = 3
+
+def table_name(r, xy_resolution, theta_resolution, extent):
+    return f"rs_lut_r{r:g}_xy{xy_resolution:g}_t{theta_resolution:g}_e{extent:g}.npy"
+
+class RSDistanceTable:
+    """
+    Obstacle-free Reeds-Shepp path lengths over a grid of relative poses
+    (x, y, theta), with trilinear interpolation between the samples.
+
+    The shortest path to (x, y, theta) is as long as the one to (-x, y, -theta)
+    (timeflip) and to (x, -y, -theta) (reflect), so only x, y >= 0 is stored:
+    table[i, j, k] is the length to (i * xy_resolution, j * xy_resolution,
+    k * theta_resolution). Poses beyond extent or within EXACT_WITHIN turning
+    radii of the origin fall back to the exact solver.
+
+    Saved as a plain .npy file and opened with mmap_mode='r', so processes
+    loading the same file share one copy through the page cache.
+    """
+    def __init__(self, table, r=MIN_RADIUS, xy_resolution=2, theta_resolution=5, extent=DEFAULT_EXTENT):
+        self.table = table
+        self.r = r
+        self.xy_resolution = xy_resolution
+        self.theta_resolution = theta_resolution
+        self.extent = extent
+        self.nxy = table.shape[0]
+        self.ntheta = table.shape[2]
+
+    @staticmethod
+    def shape(xy_resolution, theta_resolution, extent):
+        nxy = int(math.ceil(extent / xy_resolution)) + 1
+        return nxy, nxy, int(round(360 / theta_resolution))
+
+    @classmethod
+    def build(cls, r=MIN_RADIUS, xy_resolution=2, theta_resolution=5, extent=DEFAULT_EXTENT, chunk=20000):
+        """ Compute the table with the batch solver. """
+        nx, ny, nt = cls.shape(xy_resolution, theta_resolution, extent)
+        table = np.empty(nx * ny * nt, dtype=np.float32)
+        i, j, k = np.unravel_index(np.arange(table.size), (nx, ny, nt))
+        x = i * float(xy_resolution)
+        y = j * float(xy_resolution)
+        theta = k * float(theta_resolution)
+
+        for begin in range(0, table.size, chunk):
+            end = begin + chunk
+            lengths, _, _, valid = rb.get_all_paths_relative_batch(x[begin:end], y[begin:end], theta[begin:end], r)
+            table[begin:end] = rb.path_lengths_batch(lengths, valid).min(axis=1)
+
+        return cls(table.reshape(nx, ny, nt), r, xy_resolution, theta_resolution, extent)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.table))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, r=MIN_RADIUS, xy_resolution=2, theta_resolution=5, extent=DEFAULT_EXTENT):
+        """ Memory-map a saved table. The parameters must be the ones it was built with. """
+        table = np.load(path, mmap_mode='r')
+        if table.shape != cls.shape(xy_resolution, theta_resolution, extent):
+            raise ValueError(f"{path} has shape {table.shape}, not the one of a table built with these parameters")
+        return cls(table, r, xy_resolution, theta_resolution, extent)
+
+    @classmethod
+    def load_or_build(cls, cache_dir, r=MIN_RADIUS, xy_resolution=2, theta_resolution=5, extent=DEFAULT_EXTENT):
+        """ Memory-map the table from cache_dir, building and saving it there first if needed. """
+        path = os.path.join(cache_dir, table_name(r, xy_resolution, theta_resolution, extent))
+        if not os.path.exists(path):
+            cls.build(r, xy_resolution, theta_resolution, extent).save(path)
+        return cls.load(path, r, xy_resolution, theta_resolution, extent)
+
+    def lookup(self, x, y, theta):
+        """ Interpolated shortest path length to the relative pose (x, y, theta in degrees). """
+        if x < 0:
+            x, theta = -x, -theta
+        if y < 0:
+            y, theta = -y, -theta
+
+        fx = x / self.xy_resolution
+        fy = y / self.xy_resolution
+        i = int(fx)
+        j = int(fy)
+        if i + 1 >= self.nxy or j + 1 >= self.nxy or x * x + y * y < (EXACT_WITHIN * self.r) ** 2:
+            path = rs.get_optimal_path((0, 0, 0), (x, y, theta), self.r)
+            return math.inf if path is None else rs.path_length(path)
+        ft = (theta % 360) / self.theta_resolution
+        k = int(ft) % self.ntheta
+        k1 = (k + 1) % self.ntheta # Headings wrap around
+        dx, dy, dt = fx - i, fy - j, ft - int(ft)
+
+        t = self.table.item # Plain floats, numpy scalars are much slower here
+        c00 = t(i, j, k) * (1 - dx) + t(i + 1, j, k) * dx
+        c10 = t(i, j + 1, k) * (1 - dx) + t(i + 1, j + 1, k) * dx
+        c01 = t(i, j, k1) * (1 - dx) + t(i + 1, j, k1) * dx
+        c11 = t(i, j + 1, k1) * (1 - dx) + t(i + 1, j + 1, k1) * dx
+        return (c00 * (1 - dy) + c10 * dy) * (1 - dt) + (c01 * (1 - dy) + c11 * dy) * dt
+
+    def distance(self, start, end):
+        """ Approximate obstacle-free Reeds-Shepp distance between two poses (x, y, degrees). """
+        return self.lookup(*change_of_basis(start, end))
+
+    def lookup_batch(self, x, y, theta):
+        """ Vectorised lookup for arrays of relative poses, with the same exact fallbacks as lookup. """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        theta = np.asarray(theta, dtype=float)
+        theta = np.where(x < 0, -theta, theta)
+        theta = np.where(y < 0, -theta, theta)
+        x = np.abs(x)
+        y = np.abs(y)
+
+        fx = x / self.xy_resolution
+        fy = y / self.xy_resolution
+        ft = np.mod(theta, 360) / self.theta_resolution
+        exact = (fx >= self.nxy - 1) | (fy >= self.nxy - 1) | (x * x + y * y < (EXACT_WITHIN * self.r) ** 2)
+        i = np.minimum(fx.astype(int), self.nxy - 2)
+        j = np.minimum(fy.astype(int), self.nxy - 2)
+        k = ft.astype(int) % self.ntheta
+        k1 = (k + 1) % self.ntheta
+        dx, dy, dt = fx - i, fy - j, ft - np.floor(ft)
+
+        t = self.table
+        c00 = t[i, j, k] * (1 - dx) + t[i + 1, j, k] * dx
+        c10 = t[i, j + 1, k] * (1 - dx) + t[i + 1, j + 1, k] * dx
+        c01 = t[i, j, k1] * (1 - dx) + t[i + 1, j, k1] * dx
+        c11 = t[i, j + 1, k1] * (1 - dx) + t[i + 1, j + 1, k1] * dx
+        result = (c00 * (1 - dy) + c10 * dy) * (1 - dt) + (c01 * (1 - dy) + c11 * dy) * dt
+        if exact.any():
+            lengths, _, _, valid = rb.get_all_paths_relative_batch(x[exact], y[exact], theta[exact], self.r)
+            result[exact] = rb.path_lengths_batch(lengths, valid).min(axis=1)
+        return result
+
+def check(table, samples=2000, seed=0):
+    """
+    Compare lookups against the exact solver on random relative poses within
+    the arena. Returns the mean, 95th percentile and max absolute error and
+    the largest overestimate in cm (the lookup is only an admissible bound
+    once that is subtracted), and the microseconds per lookup and per exact
+    solve, as a dict.
+    """
+    rng = random.Random(seed)
+    extent = table.extent / math.sqrt(2)
+    poses = [(rng.uniform(-extent, extent), rng.uniform(-extent, extent), rng.uniform(0, 360)) for _ in range(samples)]
+
+    start = time.perf_counter()
+    approx = [table.lookup(*pose) for pose in poses]
+    lookup_us = (time.perf_counter() - start) / samples * 1e6
+
+    rs.path_cache.clear()
+    start = time.perf_counter()
+    exact = [rs.path_length(rs.get_optimal_path((0, 0, 0), pose, table.r)) for pose in poses]
+    exact_us = (time.perf_counter() - start) / samples * 1e6
+
+    differences = [a - e for a, e in zip(approx, exact)]
+    errors = sorted(abs(d) for d in differences)
+    return {
+        'mean_error': sum(errors) / samples,
+        'p95_error': errors[int(0.95 * (samples - 1))],
+        'max_error': errors[-1],
+        'max_overestimate': max(max(differences), 0),
+        'lookup_us': lookup_us,
+        'exact_us': exact_us,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Reeds-Shepp distance lookup table.")
+    parser.add_argument('--output', help="path of the .npy file, default: the standard name in --cache-dir")
+    parser.add_argument('--cache-dir', default='.')
+    parser.add_argument('--radius', type=float, default=MIN_RADIUS)
+    parser.add_argument('--xy-resolution', type=float, default=2, help="cm between samples")
+    parser.add_argument('--theta-resolution', type=float, default=5, help="degrees between samples")
+    parser.add_argument('--extent', type=float, default=DEFAULT_EXTENT, help="largest relative x and y, in cm")
+    parser.add_argument('--check', type=int, default=2000, help="random poses to compare with the exact solver")
+    args = parser.parse_args(argv)
+
+    path = args.output or os.path.join(args.cache_dir, table_name(args.radius, args.xy_resolution,
+                                                                  args.theta_resolution, args.extent))
+    start = time.perf_counter()
+    RSDistanceTable.build(args.radius, args.xy_resolution, args.theta_resolution, args.extent).save(path)
+    print(f"Built {path} in {time.perf_counter() - start:.1f} s ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    if args.check:
+        table = RSDistanceTable.load(path, args.radius, args.xy_resolution, args.theta_resolution, args.extent)
+        report = check(table, args.check)
+        print(f"Error vs exact: mean {report['mean_error']:.3f} cm, p95 {report['p95_error']:.3f} cm, "
+              f"max {report['max_error']:.3f} cm, largest overestimate {report['max_overestimate']:.3f} cm")
+        print(f"Lookup {report['lookup_us']:.1f} us, exact solve {report['exact_us']:.1f} us")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,11 @@
-import matplotlib.pyplot as plt
 import reeds_shepp as rs
 from pillars import get_pillars
 from robot import Robot
 from params import ARENA_WIDTH, ARENA_HEIGHT, CELL_SIZE
 from arena import draw_arena_boundary, world2grid
-import itertools
 import math
+from planner import find_best_tour
+from collision_index import OccupancyGrid
 
 def visualize(position, circles=False, color='orange'):
     pillar_data = [(80, 80, 'E'), (110, 20, 'E'), (190, 60, 'W'), (170, 180, 'S'), (70, 120, 'N'), (0, 80, 'E')]
@@ -15,11 +15,13 @@ def visualize(position, circles=False, color='orange'):
     robot = Robot(position[0], position[1], position[2], pillars, color)
     robot.draw(circles)
 
-# Set up the figure and axis
-fig, ax = plt.subplots()
-ax.set_title('MDP Simulator', fontsize=16)
-
 def main():
+    import matplotlib.pyplot as plt
+
+    # Set up the figure and axis
+    fig, ax = plt.subplots()
+    ax.set_title('MDP Simulator', fontsize=16)
+
     PADDING = 50  # cm beyond the arena for visualization purposes
     ax.set_xlim(-PADDING, ARENA_WIDTH + PADDING)
     ax.set_ylim(-PADDING, ARENA_HEIGHT + PADDING)
@@ -39,7 +41,7 @@ def main():
     pillar_data = [(180, 180, 'S'), (20, 170, 'E'), (180, 20, 'W')]
     pillars = get_pillars(pillar_data)
 
-    robot = Robot(20, 20, 0, pillars) # Robot starting position
+    robot = Robot(20, 20, 0, pillars, collision_index=OccupancyGrid(pillars)) # Robot starting position
     for pillar in pillars:
         pillar.draw(ax)
 
@@ -58,64 +60,15 @@ def main():
         probot.draw(False)
 
     #hamiltonian path test
-    perms = list(itertools.permutations(waypoints))
-
-    def calc_distance(path):
-            # Create all target points, including the start.
-            dist = math.sqrt(((path[0][0] - robot.x) ** 2) +
-                                  ((path[0][1] - robot.y) ** 2))
-            for i in range(len(path) - 1):
-                dist += math.sqrt(((path[i][0] - path[i + 1][0]) ** 2) +
-                                  ((path[i][1] - path[i + 1][1]) ** 2))
-            return dist
-    PATHS = sorted(perms, key=calc_distance)
-
-    def has_final_path(PATH):
-        path_length = 0
-        for i in range(len(PATH) - 1):
-            print(f"Finding path from {PATH[i]} to {PATH[i+1]}...")
-            paths = rs.get_sorted_paths(PATH[i], PATH[i+1])
-
-            # Check if no path exist
-            if not paths:
-                print("No path exists between {} and {}.".format(PATH[i], PATH[i+1]))
-                return False
-
-            valid_path_found = False
-            for potential_path in paths:
-                collision_detected, end_x, end_y, end_degrees = robot.simulate_reeds_shepps_path(potential_path, robot.sim_x, robot.sim_y, robot.sim_degrees)
-
-                if not collision_detected:
-                    # If there is no collision, it's a valid path.
-                    print(f"Path Found and Added!: {potential_path}, length: {rs.path_length(potential_path)}")
-                    final_path.append(potential_path)
-                    path_length += rs.path_length(potential_path)
-                    valid_path_found = True
-
-                    # Update the robot's position and orientation for the next segment
-                    robot.sim_x, robot.sim_y, robot.sim_degrees = end_x, end_y, end_degrees
-                    break
-
-            if not valid_path_found:
-                print(f"No valid paths found between {PATH[i]} and {PATH[i+1]}.")
-                return False
-
-        # Now you have your final path (which is a list of paths) and its length.
-        print("Final Path Length:", path_length)
-        return True
-
-    final_path = []
-    for PATH in PATHS:
-        # insert starting point
-        l = list(PATH)
-        l.insert(0, (robot.x, robot.y, robot.degrees))
-        PATH = tuple(l)
-        if has_final_path(PATH):
-            break
-        final_path = []
+    order, final_path = find_best_tour(robot, waypoints)
 
     if not final_path:
         print("No Paths Found at All!")
+    else:
+        for path in final_path:
+            print(f"Path Found and Added!: {path}, length: {rs.path_length(path)}")
+        print("Final Path Length:", sum(rs.path_length(path) for path in final_path))
+        print("Visiting order:", [waypoints[i] for i in order])
 
 
     for path in final_path:
@@ -1,5 +1,8 @@
 import pygame
 import sys
+import time
+from collections import deque
+from grid_occupancy import GridOccupancy
 
 # Initialize pygame
 pygame.init()
@@ -43,45 +46,33 @@ def adjust_y(y, height):
 
 
 class Robot:
-    def __init__(self, x, y, direction='E'):
+    def __init__(self, x, y, direction='E', occupancy=None, verbose=True):
         self.x = x
         self.y = y
         self.direction = direction
         self.turning_radius = 4
-
-    def check_within_arena(self, new_x, new_y):
-        # Check if the entire 3x3 robot footprint is within the arena
-        return 0 <= new_x <= GRID_SIZE - 3 and 0 <= new_y <= GRID_SIZE - 3
-
-    def check_collision(self, new_x, new_y, pillar_x, pillar_y):
-        # Check if any part of the 3x3 robot footprint overlaps with the 3x3 pillar footprint
-        for dx in range(3):  # Robot footprint width
-            for dy in range(3):  # Robot footprint height
-                for pdx in range(-1, 2):  # Pillar footprint width
-                    for pdy in range(-1, 2):  # Pillar footprint height
-                        if new_x + dx == pillar_x + pdx and new_y + dy == pillar_y + pdy:
-                            return True
-        return False
+        self.occupancy = occupancy # GridOccupancy to check moves against, default: the simulator's
+        self.verbose = verbose
 
     def move(self, dx, dy, new_direction):
         new_x = self.x + dx
         new_y = self.y + dy
 
-        # Check for collision with pillars
-        for pillar in pillars:
-            if self.check_collision(new_x, new_y, pillar.x, pillar.y):
-                print("Collision detected!")
-                return  # Collision detected with pillar
-            
-        # Check for collision with arena boundaries
-        if not self.check_within_arena(new_x, new_y):
-            print("Collision detected with arena boundary!")
-            return  # Collision detected with arena boundary
+        # One footprint mask test covers the pillars and the arena boundaries
+        grid = self.occupancy if self.occupancy is not None else occupancy
+        if grid.blocked(new_x, new_y):
+            if self.verbose:
+                if grid.pillar_blocked(new_x, new_y):
+                    print("Collision detected!")
+                else:
+                    print("Collision detected with arena boundary!")
+            return False
 
         # Update position and direction
         self.x = new_x
         self.y = new_y
         self.direction = new_direction
+        return True
 
     def move_forward(self):
         dx, dy = 0, 0
@@ -94,7 +85,7 @@ class Robot:
         elif self.direction == 'S':
             dy = -1
 
-        self.move(dx, dy, self.direction)
+        return self.move(dx, dy, self.direction)
 
     def move_backward(self):
         dx, dy = 0, 0
@@ -107,7 +98,7 @@ class Robot:
         elif self.direction == 'S':
             dy = 1
 
-        self.move(dx, dy, self.direction)
+        return self.move(dx, dy, self.direction)
 
     def move_forward_right(self):
         dx, dy = 0, 0
@@ -125,7 +116,7 @@ class Robot:
             dx, dy = -self.turning_radius, self.turning_radius
             new_direction = 'N'
 
-        self.move(dx, dy, new_direction)
+        return self.move(dx, dy, new_direction)
 
     def move_forward_left(self):
         dx, dy = 0, 0
@@ -143,7 +134,7 @@ class Robot:
             dx, dy = self.turning_radius, self.turning_radius
             new_direction = 'N'
 
-        self.move(dx, dy, new_direction)
+        return self.move(dx, dy, new_direction)
 
     def move_backward_right(self):
         dx, dy = 0, 0
@@ -152,16 +143,16 @@ class Robot:
             dx, dy = self.turning_radius, -self.turning_radius
             new_direction = 'W'
         elif self.direction == 'E':
-            dx, dy = self.turning_radius, self.turning_radius
+            dx, dy = -self.turning_radius, -self.turning_radius
             new_direction = 'N'
         elif self.direction == 'S':
             dx, dy = -self.turning_radius, self.turning_radius
             new_direction = 'E'
         elif self.direction == 'W':
-            dx, dy = -self.turning_radius, -self.turning_radius
+            dx, dy = self.turning_radius, self.turning_radius
             new_direction = 'S'
 
-        self.move(dx, dy, new_direction)
+        return self.move(dx, dy, new_direction)
 
     def move_backward_left(self):
         dx, dy = 0, 0
@@ -179,7 +170,7 @@ class Robot:
             dx, dy = self.turning_radius, -self.turning_radius
             new_direction = 'N'
 
-        self.move(dx, dy, new_direction)
+        return self.move(dx, dy, new_direction)
 
 
     def draw(self, screen):
@@ -317,12 +308,17 @@ class Button:
         self.color = color
         self.action = action
 
+    font = None # Shared by all buttons, loaded on first draw
+
     def draw(self, screen):
+        if Button.font is None:
+            Button.font = pygame.font.SysFont(None, 25)
+        if getattr(self, 'text_surf', None) is None:
+            self.text_surf = Button.font.render(self.text, True, BLACK)
+
         pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
-        font = pygame.font.SysFont(None, 25)
-        text_surf = font.render(self.text, True, BLACK)
-        text_rect = text_surf.get_rect(center=(self.x + self.width/2, self.y + self.height/2))
-        screen.blit(text_surf, text_rect)
+        text_rect = self.text_surf.get_rect(center=(self.x + self.width/2, self.y + self.height/2))
+        screen.blit(self.text_surf, text_rect)
 
     def is_over(self, pos):
         return self.x < pos[0] < self.x + self.width and self.y < pos[1] < self.y + self.height
@@ -337,6 +333,18 @@ pillars = [
     Pillar(19, 15, 'W')
 ]
 
+# Inflated pillar cells and the arena border, kept in step with pillars by
+# add_pillar and remove_pillar (or occupancy.sync after editing the list)
+occupancy = GridOccupancy(GRID_SIZE, [(pillar.x, pillar.y) for pillar in pillars])
+
+def add_pillar(pillar):
+    pillars.append(pillar)
+    occupancy.add_pillar(pillar.x, pillar.y)
+
+def remove_pillar(pillar):
+    pillars.remove(pillar)
+    occupancy.remove_pillar(pillar.x, pillar.y)
+
 # Initialize robot
 robot = Robot(1, 1, 'E')
 
@@ -353,33 +361,169 @@ buttons = [
     Button(start_x + 2*(BUTTON_WIDTH + BUTTON_SPACING), start_y + BUTTON_HEIGHT + BUTTON_SPACING, BUTTON_WIDTH, BUTTON_HEIGHT, "Bwd-R", LIGHT_GRAY, robot.move_backward_right)
 ]
 
-def draw_arena():
-    screen.fill(WHITE)
-
-    # Draw buttons
-    for button in buttons:
-        button.draw(screen)
-
-    for x in range(GRID_SIZE):
-        for y in range(GRID_SIZE):
-            adjusted_y = adjust_y(scaled(y * CELL_SIZE), scaled(CELL_SIZE))
-            pygame.draw.rect(screen, DARK_GRAY, (scaled(x * CELL_SIZE), adjusted_y, scaled(CELL_SIZE), scaled(CELL_SIZE)), 1)
-
-    
-    # Draw pillars
-    for pillar in pillars:
-        pillar.draw(screen)
-    
-    # Draw robot
-    robot.draw(screen)
+def robot_rect(robot):
+    """ Screen area covered by the robot's drawing. """
+    size = scaled(CELL_SIZE * 3)
+    return pygame.Rect(scaled(robot.x * CELL_SIZE), adjust_y(scaled(robot.y * CELL_SIZE), size), size, size).inflate(4, 4)
+
+def pillar_rect(x, y):
+    """ Screen area covered by the pillar at (x, y) and its collision zone. """
+    size = scaled(CELL_SIZE)
+    return pygame.Rect(scaled((x - 1) * CELL_SIZE), adjust_y(scaled((y + 2) * CELL_SIZE), 0), 3 * size, 3 * size).inflate(2, 2)
+
+def pillar_state(pillar):
+    return (pillar.x, pillar.y, pillar.boolReached, pillar.image_direction)
+
+class Renderer:
+    """
+    Draws the arena with the static parts (grid, buttons, pillars) cached on a
+    background surface. Each frame only the areas that changed are repainted
+    and pushed to the display: where the robot was, where it is now, and any
+    pillar that was added, removed, moved or reached.
+
+    One Clock is kept for the whole session, and the last frame times are
+    kept for frame_stats().
+    """
+    def __init__(self, screen, fps=60, history=600):
+        self.screen = screen
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self.background = pygame.Surface(screen.get_size())
+        self.pillar_states = {}
+        self.robot_rect = None
+        self.robot_direction = None
+        self.frame_times = deque(maxlen=history) # Seconds spent drawing each frame
+        self.frames = 0
+        self.rebuild()
+
+    def paint_static(self, area=None):
+        """ Paint the static scene onto the background, only inside area if given. """
+        surface = self.background
+        surface.set_clip(area)
+        surface.fill(WHITE)
+
+        # Draw buttons
+        for button in buttons:
+            button.draw(surface)
+
+        for x in range(GRID_SIZE):
+            for y in range(GRID_SIZE):
+                adjusted_y = adjust_y(scaled(y * CELL_SIZE), scaled(CELL_SIZE))
+                pygame.draw.rect(surface, DARK_GRAY, (scaled(x * CELL_SIZE), adjusted_y, scaled(CELL_SIZE), scaled(CELL_SIZE)), 1)
+
+        # Draw pillars
+        for pillar in pillars:
+            pillar.draw(surface)
+        surface.set_clip(None)
+
+    def rebuild(self):
+        """ Repaint the whole background, and the whole screen on the next frame. """
+        self.paint_static()
+        self.pillar_states = {id(pillar): pillar_state(pillar) for pillar in pillars}
+        self.robot_rect = None
+
+    def changed_pillar_rects(self):
+        """ Return the areas of pillars that changed since the last frame, and remember their state. """
+        rects = []
+        states = {}
+        for pillar in pillars:
+            state = pillar_state(pillar)
+            states[id(pillar)] = state
+            old = self.pillar_states.get(id(pillar))
+            if old != state:
+                rects.append(pillar_rect(pillar.x, pillar.y))
+                if old is not None:
+                    rects.append(pillar_rect(old[0], old[1]))
+        for key, old in self.pillar_states.items():
+            if key not in states:
+                rects.append(pillar_rect(old[0], old[1]))
+        self.pillar_states = states
+        return rects
+
+    def draw(self):
+        start = time.perf_counter()
+
+        if self.robot_rect is None:
+            # First frame or after a rebuild: push the whole screen
+            self.screen.blit(self.background, (0, 0))
+            robot.draw(self.screen)
+            self.robot_rect = robot_rect(robot)
+            pygame.display.flip()
+        else:
+            dirty = self.changed_pillar_rects()
+            for rect in dirty:
+                self.paint_static(rect)
+
+            new_rect = robot_rect(robot)
+            if dirty or new_rect != self.robot_rect or robot.direction != self.robot_direction:
+                dirty += [self.robot_rect, new_rect]
+                for rect in dirty:
+                    self.screen.blit(self.background, rect, rect)
+                robot.draw(self.screen)
+                self.robot_rect = new_rect
+                pygame.display.update(dirty)
+
+        self.robot_direction = robot.direction
+        self.frame_times.append(time.perf_counter() - start)
+        self.frames += 1
+
+    def tick(self):
+        """ Wait for the next frame at the target rate. """
+        return self.clock.tick(self.fps)
+
+    def frame_stats(self):
+        """ Draw time per frame (mean and p95, in ms) and the actual frame rate. """
+        times = sorted(self.frame_times)
+        if not times:
+            return {'frames': 0}
+        return {
+            'frames': self.frames,
+            'fps': round(self.clock.get_fps(), 1),
+            'draw_mean_ms': round(sum(times) / len(times) * 1000, 3),
+            'draw_p95_ms': round(times[int(0.95 * (len(times) - 1))] * 1000, 3),
+        }
+
+# Commands for replay, named after the buttons
+COMMANDS = {
+    'F': Robot.move_forward,
+    'B': Robot.move_backward,
+    'FL': Robot.move_forward_left,
+    'FR': Robot.move_forward_right,
+    'BL': Robot.move_backward_left,
+    'BR': Robot.move_backward_right,
+}
+
+def replay(commands, pillar_cells, start=(1, 1, 'E'), verbose=False):
+    """
+    Headless batch replay: run a sequence of COMMANDS names from start among
+    pillars at the (x, y) cells of pillar_cells, without drawing anything.
+    Returns (final (x, y, direction), moves made, moves blocked).
+    """
+    grid = GridOccupancy(GRID_SIZE, pillar_cells)
+    bot = Robot(*start, occupancy=grid, verbose=verbose)
+    moved = blocked = 0
+    for command in commands:
+        if COMMANDS[command](bot):
+            moved += 1
+        else:
+            blocked += 1
+    return (bot.x, bot.y, bot.direction), moved, blocked
+
+renderer = None
 
-    pygame.display.flip()
+def draw_arena():
+    global renderer
+    if renderer is None:
+        renderer = Renderer(screen)
+    renderer.draw()
 
 def main():
     global robot, pillars  # Allow modification of global variables
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if renderer is not None:
+                    print("Frame stats:", renderer.frame_stats())
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -389,7 +533,7 @@ def main():
                             button.action()
 
         draw_arena()
-        pygame.time.Clock().tick(60)
+        renderer.tick()
 
 if __name__ == "__main__":
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
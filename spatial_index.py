@@ -0,0 +1,59 @@
+import math
+from params import CELL_SIZE
+from collision_index import pillar_box
+
+class PillarGrid:
+    """
+    Uniform bucket grid over the pillars, aligned to CELL_SIZE. Each bucket
+    lists the pillars whose inflated collision zone overlaps it, so a query
+    only looks at pillars near the queried box instead of scanning them all.
+
+    With linear_limit pillars or fewer, queries just return every pillar:
+    scanning a short list is cheaper than visiting the buckets.
+    """
+    def __init__(self, pillars, cell_size=CELL_SIZE, linear_limit=12):
+        self.cell_size = cell_size
+        self.linear_limit = linear_limit
+        self.pillars = []
+        self.buckets = {}
+        for pillar in pillars:
+            self.add(pillar)
+
+    def cell_range(self, lo, hi):
+        return range(int(math.floor(lo / self.cell_size)), int(math.floor(hi / self.cell_size)) + 1)
+
+    def add(self, pillar):
+        if pillar not in self.pillars:
+            self.pillars.append(pillar)
+        x_min, y_min, x_max, y_max = pillar_box(pillar)
+        for i in self.cell_range(x_min, x_max):
+            for j in self.cell_range(y_min, y_max):
+                self.buckets.setdefault((i, j), []).append(pillar)
+
+    def query_box(self, x_min, y_min, x_max, y_max):
+        """
+        Return the pillars whose collision zone may overlap the box, without
+        duplicates.
+        """
+        if len(self.pillars) <= self.linear_limit:
+            return self.pillars
+        found = {}
+        for i in self.cell_range(x_min, x_max):
+            for j in self.cell_range(y_min, y_max):
+                for pillar in self.buckets.get((i, j), ()):
+                    found[id(pillar)] = pillar
+        return list(found.values())
+
+    def query_point(self, x, y):
+        """ Return the pillars whose collision zone may contain (x, y). """
+        if len(self.pillars) <= self.linear_limit:
+            return self.pillars
+        return self.buckets.get((int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))), [])
+
+    def query_points(self, points):
+        """ Return the candidate pillars for the bounding box of the given points. """
+        if len(self.pillars) <= self.linear_limit:
+            return self.pillars
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        return self.query_box(min(xs), min(ys), max(xs), max(ys))
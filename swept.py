@@ -0,0 +1,227 @@
+import math
+from reeds_shepp import Steering
+from params import ARENA_WIDTH, ARENA_HEIGHT, ROBOT_FOOTPRINT_WIDTH, ROBOT_FOOTPRINT_HEIGHT, MIN_RADIUS
+from collision_index import BOUNDARY_PADDING, pillar_box
+from kinematics import heading_sign, turning_center, advance
+
+TWO_PI = 2 * math.pi
+
+def footprint_discs(subdivisions=2):
+    """
+    Return (offsets, radius) of subdivisions x subdivisions discs covering the
+    robot footprint, with offsets relative to the robot's (x, y) at 0 degrees.
+    """
+    w = ROBOT_FOOTPRINT_WIDTH / subdivisions
+    h = ROBOT_FOOTPRINT_HEIGHT / subdivisions
+    offsets = [((i + 0.5) * w, (j + 0.5) * h) for i in range(subdivisions) for j in range(subdivisions)]
+    return offsets, math.hypot(w, h) / 2
+
+# One disc around the whole footprint for the broad phase, and a tighter
+# cover of smaller discs that is only tested when the broad phase hits
+BOUND_DISC = footprint_discs(1)
+FINE_DISCS = footprint_discs(2)
+
+def point_segment_distance(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+def segments_intersect(ax, ay, bx, by, cx, cy, dx, dy):
+    def cross(ox, oy, px, py, qx, qy):
+        return (px - ox) * (qy - oy) - (py - oy) * (qx - ox)
+    d1 = cross(cx, cy, dx, dy, ax, ay)
+    d2 = cross(cx, cy, dx, dy, bx, by)
+    d3 = cross(ax, ay, bx, by, cx, cy)
+    d4 = cross(ax, ay, bx, by, dx, dy)
+    return ((d1 > 0) != (d2 > 0)) and ((d3 > 0) != (d4 > 0))
+
+def segment_segment_distance(ax, ay, bx, by, cx, cy, dx, dy):
+    if segments_intersect(ax, ay, bx, by, cx, cy, dx, dy):
+        return 0.0
+    return min(point_segment_distance(ax, ay, cx, cy, dx, dy),
+               point_segment_distance(bx, by, cx, cy, dx, dy),
+               point_segment_distance(cx, cy, ax, ay, bx, by),
+               point_segment_distance(dx, dy, ax, ay, bx, by))
+
+def box_edges(box):
+    x_min, y_min, x_max, y_max = box
+    return [(x_min, y_min, x_max, y_min), (x_max, y_min, x_max, y_max),
+            (x_max, y_max, x_min, y_max), (x_min, y_max, x_min, y_min)]
+
+def in_box(px, py, box):
+    return box[0] < px < box[2] and box[1] < py < box[3]
+
+def segment_box_distance(ax, ay, bx, by, box):
+    """ Distance between the line segment a-b and the box, 0 if they overlap. """
+    if in_box(ax, ay, box) or in_box(bx, by, box):
+        return 0.0
+    return min(segment_segment_distance(ax, ay, bx, by, *edge) for edge in box_edges(box))
+
+class Arc:
+    """
+    Arc of the circle centred at (cx, cy) with the given radius, from angle
+    start (radians) sweeping anticlockwise by sweep.
+    """
+    __slots__ = ('cx', 'cy', 'radius', 'start', 'sweep')
+
+    def __init__(self, cx, cy, radius, start, sweep):
+        if sweep < 0:
+            start, sweep = start + sweep, -sweep
+        self.cx, self.cy, self.radius = cx, cy, radius
+        self.start, self.sweep = start % TWO_PI, sweep
+
+    def contains_angle(self, angle):
+        return self.sweep >= TWO_PI or (angle - self.start) % TWO_PI <= self.sweep
+
+    def point(self, angle):
+        return self.cx + self.radius * math.cos(angle), self.cy + self.radius * math.sin(angle)
+
+    def endpoints(self):
+        return self.point(self.start), self.point(self.start + self.sweep)
+
+    def point_distance(self, px, py):
+        angle = math.atan2(py - self.cy, px - self.cx)
+        if self.contains_angle(angle):
+            return abs(math.hypot(px - self.cx, py - self.cy) - self.radius)
+        (ax, ay), (bx, by) = self.endpoints()
+        return min(math.hypot(px - ax, py - ay), math.hypot(px - bx, py - by))
+
+    def segment_distance(self, ax, ay, bx, by):
+        """
+        Distance between the arc and the line segment a-b. The closest pair of
+        points is at an endpoint of one of them, at the foot of the
+        perpendicular from the centre to the segment, or at an intersection.
+        """
+        (sx, sy), (ex, ey) = self.endpoints()
+        best = min(self.point_distance(ax, ay), self.point_distance(bx, by),
+                   point_segment_distance(sx, sy, ax, ay, bx, by),
+                   point_segment_distance(ex, ey, ax, ay, bx, by))
+
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        if length2 == 0:
+            return best
+        t = ((self.cx - ax) * dx + (self.cy - ay) * dy) / length2
+        if 0 <= t <= 1:
+            best = min(best, self.point_distance(ax + t * dx, ay + t * dy))
+
+        # Intersections of the segment with the full circle
+        fx, fy = ax - self.cx, ay - self.cy
+        b = 2 * (fx * dx + fy * dy)
+        c = fx * fx + fy * fy - self.radius * self.radius
+        disc = b * b - 4 * length2 * c
+        if disc >= 0:
+            root = math.sqrt(disc)
+            for t in ((-b - root) / (2 * length2), (-b + root) / (2 * length2)):
+                if 0 <= t <= 1:
+                    angle = math.atan2(fy + t * dy, fx + t * dx)
+                    if self.contains_angle(angle):
+                        return 0.0
+        return best
+
+    def box_distance(self, box):
+        """ Distance between the arc and the box, 0 if they overlap. """
+        (sx, sy), (ex, ey) = self.endpoints()
+        if in_box(sx, sy, box) or in_box(ex, ey, box):
+            return 0.0
+        return min(self.segment_distance(*edge) for edge in box_edges(box))
+
+    def bounds(self):
+        """ Return (x_min, y_min, x_max, y_max) of the arc. """
+        (sx, sy), (ex, ey) = self.endpoints()
+        xs, ys = [sx, ex], [sy, ey]
+        for k in range(4):
+            angle = k * math.pi / 2
+            if self.contains_angle(angle):
+                px, py = self.point(angle)
+                xs.append(px)
+                ys.append(py)
+        return min(xs), min(ys), max(xs), max(ys)
+
+def disc_centre(x, y, degrees, offset):
+    theta = math.radians(degrees)
+    c, s = math.cos(theta), math.sin(theta)
+    return x + offset[0] * c - offset[1] * s, y + offset[0] * s + offset[1] * c
+
+def sweep_disc(x, y, degrees, e, offset, r=MIN_RADIUS):
+    """
+    Return the curve followed by a footprint disc centre while the robot drives
+    segment e from (x, y, degrees): a (ax, ay, bx, by) line segment for
+    straights, an Arc for turns.
+    """
+    ax, ay = disc_centre(x, y, degrees, offset)
+    if e.steering == Steering.STRAIGHT:
+        nx, ny, nd = advance(x, y, degrees, e.steering, e.gear, e.param, r)
+        bx, by = disc_centre(nx, ny, nd, offset)
+        return (ax, ay, bx, by)
+
+    # The whole body rotates about the turning centre
+    cx, cy = turning_center(x, y, degrees, e.steering, r)
+    sweep = heading_sign(e.steering, e.gear) * e.param / r
+    return Arc(cx, cy, math.hypot(ax - cx, ay - cy), math.atan2(ay - cy, ax - cx), sweep)
+
+def curve_bounds(curve):
+    if isinstance(curve, Arc):
+        return curve.bounds()
+    ax, ay, bx, by = curve
+    return min(ax, bx), min(ay, by), max(ax, bx), max(ay, by)
+
+def curve_box_distance(curve, box):
+    if isinstance(curve, Arc):
+        return curve.box_distance(box)
+    return segment_box_distance(*curve, box)
+
+def discs_collide(x, y, degrees, e, discs, boxes, r=MIN_RADIUS):
+    """ Whether any disc of the footprint cover leaves the arena or enters a box during segment e. """
+    offsets, radius = discs
+    for offset in offsets:
+        curve = sweep_disc(x, y, degrees, e, offset, r)
+        x_min, y_min, x_max, y_max = curve_bounds(curve)
+        if (x_min - radius < -BOUNDARY_PADDING or x_max + radius > ARENA_WIDTH + BOUNDARY_PADDING or
+                y_min - radius < -BOUNDARY_PADDING or y_max + radius > ARENA_HEIGHT + BOUNDARY_PADDING):
+            return True
+        for box in boxes:
+            # Cheap rejection on the bounding boxes first
+            if (box[0] >= x_max + radius or box[2] <= x_min - radius or
+                    box[1] >= y_max + radius or box[3] <= y_min - radius):
+                continue
+            if curve_box_distance(curve, box) < radius:
+                return True
+    return False
+
+def segment_collides(x, y, degrees, e, boxes, r=MIN_RADIUS):
+    """
+    Whether the footprint collides anywhere along segment e. The footprint is
+    covered by discs, so the test is conservative: it never misses a
+    collision, but may report one within a few cm of a collision zone.
+    """
+    if not discs_collide(x, y, degrees, e, BOUND_DISC, boxes, r):
+        return False
+    return discs_collide(x, y, degrees, e, FINE_DISCS, boxes, r)
+
+def check_path(path, start_x, start_y, start_degrees, pillars, r=MIN_RADIUS, index=None):
+    """
+    Swept-volume counterpart of Robot.simulate_reeds_shepps_path: returns
+    (True, None, None, None) if the robot collides anywhere along the path,
+    otherwise (False, end_x, end_y, end_degrees).
+
+    With a spatial_index.PillarGrid as index, each segment is only tested
+    against the pillars near the area it sweeps.
+    """
+    if index is None:
+        boxes = [pillar_box(pillar) for pillar in pillars]
+    x, y, degrees = start_x, start_y, start_degrees
+
+    for e in path:
+        if index is not None:
+            (offset,), radius = BOUND_DISC
+            x_min, y_min, x_max, y_max = curve_bounds(sweep_disc(x, y, degrees, e, offset, r))
+            boxes = [pillar_box(pillar) for pillar in index.query_box(x_min - radius, y_min - radius, x_max + radius, y_max + radius)]
+        if segment_collides(x, y, degrees, e, boxes, r):
+            return True, None, None, None
+        x, y, degrees = advance(x, y, degrees, e.steering, e.gear, e.param, r)
+
+    return False, x, y, degrees
@@ -0,0 +1,349 @@
+import math
+import time
+import heapq
+
+def held_karp(cost):
+    """
+    Return (length, order) of the cheapest open tour that starts at node 0 and
+    visits every other node of the cost matrix exactly once.
+
+    cost[i][j] is the cost of the leg from node i to node j, math.inf if the
+    leg is infeasible (e.g. every candidate path collides). order lists the
+    visited node indices, excluding the start. Returns (math.inf, None) when no
+    feasible tour exists.
+
+    Held-Karp bitmask DP: O(2^n * n^2) time and O(2^n * n) memory.
+    """
+    n = len(cost) - 1
+    if n <= 0:
+        return 0, []
+
+    full = (1 << n) - 1
+    # dp[mask][j]: cheapest cost to leave the start, visit the waypoints in mask
+    # and stop at waypoint j (waypoint j is node j + 1 in the cost matrix)
+    dp = [[math.inf] * n for _ in range(full + 1)]
+    parent = [[-1] * n for _ in range(full + 1)]
+
+    for j in range(n):
+        dp[1 << j][j] = cost[0][j + 1]
+
+    for mask in range(1, full + 1):
+        row = dp[mask]
+        for j in range(n):
+            c = row[j]
+            if c == math.inf or not (mask >> j) & 1:
+                continue
+            leg = cost[j + 1]
+            for k in range(n):
+                if (mask >> k) & 1:
+                    continue
+                new_cost = c + leg[k + 1]
+                new_mask = mask | (1 << k)
+                if new_cost < dp[new_mask][k]:
+                    dp[new_mask][k] = new_cost
+                    parent[new_mask][k] = j
+
+    last = min(range(n), key=lambda j: dp[full][j])
+    best = dp[full][last]
+    if best == math.inf:
+        return math.inf, None
+
+    # Walk the parent pointers back to the start
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last + 1)
+        prev = parent[mask][last]
+        mask ^= 1 << last
+        last = prev
+    order.reverse()
+
+    return best, order
+
+def branch_and_bound(cost, upper_bound=math.inf, deadline=None, estimate=None):
+    """
+    Return (length, order) of the cheapest open tour from node 0, like
+    held_karp, using depth-first branch-and-bound instead of the full DP table.
+
+    A partial tour is pruned once its cost plus the cheapest incoming leg of
+    every unvisited node reaches the best tour found so far (or upper_bound).
+    Uses O(n) memory, and is usually much faster than held_karp when most legs
+    are infeasible or a good upper bound is known.
+
+    With a deadline (a time.perf_counter() value), the search stops there and
+    returns the best tour found so far, which may not be optimal.
+
+    estimate is an optional matrix of lower bounds on cost, as for
+    nearest_first; the bound and the child order then come from it, so a cost
+    matrix computed on demand only solves the legs the search follows.
+    """
+    n = len(cost)
+    if n <= 1:
+        return 0, []
+    estimate = estimate or cost
+
+    # Cheapest way into each node, used as an admissible lower bound
+    min_in = [min((estimate[i][j] for i in range(n) if i != j), default=math.inf) for j in range(n)]
+
+    best = [upper_bound, None]
+    visited = [False] * n
+    visited[0] = True
+    order = []
+
+    def search(node, so_far, remaining_bound):
+        if deadline is not None and time.perf_counter() >= deadline:
+            return
+        if len(order) == n - 1:
+            if so_far < best[0]:
+                best[0] = so_far
+                best[1] = list(order)
+            return
+
+        # Expand the cheapest legs first so good tours are found early
+        unvisited = [j for j in range(1, n) if not visited[j]]
+        for leg, j in nearest_first(cost, estimate, node, unvisited, deadline):
+            bound = remaining_bound - min_in[j]
+            if so_far + leg + bound >= best[0]:
+                continue
+            visited[j] = True
+            order.append(j)
+            search(j, so_far + leg, bound)
+            order.pop()
+            visited[j] = False
+
+    search(0, 0, sum(min_in[1:]))
+
+    if best[1] is None:
+        return math.inf, None
+    return best[0], best[1]
+
+def generalized_held_karp(cost, clusters):
+    """
+    Generalised TSP: return (length, order) of the cheapest open tour from
+    node 0 that visits exactly one node of every cluster, e.g. one of several
+    candidate viewing poses per pillar. clusters is a list of lists of node
+    indices (not containing node 0), and order lists the chosen node of each
+    cluster in visiting order. Returns (math.inf, None) when no feasible tour
+    exists.
+
+    Held-Karp over clusters: O(2^m * k^2) time for m clusters with k nodes in
+    total. Legs between nodes of the same cluster are never looked at.
+    """
+    m = len(clusters)
+    if m == 0:
+        return 0, []
+
+    nodes = [node for cluster in clusters for node in cluster]
+    cluster_of = {}
+    for c, cluster in enumerate(clusters):
+        for node in cluster:
+            cluster_of[node] = c
+
+    # Local copy of the legs the DP needs, so lazily solved costs are only
+    # computed once and the inner loop indexes plain lists
+    position = {node: p for p, node in enumerate(nodes)}
+    legs = [[cost[u][v] if cluster_of[u] != cluster_of[v] else math.inf for v in nodes] for u in nodes]
+    members = [[position[node] for node in cluster] for cluster in clusters]
+
+    full = (1 << m) - 1
+    k = len(nodes)
+    dp = [[math.inf] * k for _ in range(full + 1)]
+    parent = [[-1] * k for _ in range(full + 1)]
+
+    for c, cluster in enumerate(clusters):
+        for node in cluster:
+            dp[1 << c][position[node]] = cost[0][node]
+
+    for mask in range(1, full + 1):
+        row = dp[mask]
+        for c in range(m):
+            if not (mask >> c) & 1:
+                continue
+            for u in members[c]:
+                so_far = row[u]
+                if so_far == math.inf:
+                    continue
+                leg = legs[u]
+                for d in range(m):
+                    if (mask >> d) & 1:
+                        continue
+                    new_mask = mask | (1 << d)
+                    new_row = dp[new_mask]
+                    for v in members[d]:
+                        new_cost = so_far + leg[v]
+                        if new_cost < new_row[v]:
+                            new_row[v] = new_cost
+                            parent[new_mask][v] = u
+
+    last = min(range(k), key=lambda v: dp[full][v])
+    best = dp[full][last]
+    if best == math.inf:
+        return math.inf, None
+
+    # Walk the parent pointers back to the start
+    order = []
+    mask = full
+    while last != -1:
+        order.append(nodes[last])
+        prev = parent[mask][last]
+        mask ^= 1 << cluster_of[nodes[last]]
+        last = prev
+    order.reverse()
+
+    return best, order
+
+def tour_length(cost, order):
+    """ Cost of visiting the nodes in order, starting from node 0. """
+    length = 0
+    prev = 0
+    for node in order:
+        length += cost[prev][node]
+        prev = node
+    return length
+
+def nearest_first(cost, estimate, node, candidates, deadline=None):
+    """
+    Yield (leg cost, j) for the feasible legs from node to the candidates in
+    increasing cost. estimate[node][j] must never exceed cost[node][j]: legs
+    are looked up in estimate order, and only until no unseen leg can be
+    cheaper than the best one found, so most costs are never computed.
+
+    Stops early, without looking up more legs, once the deadline has passed.
+    """
+    found = []
+    for j in sorted(candidates, key=lambda j: estimate[node][j]):
+        while found and found[0][0] <= estimate[node][j]:
+            yield heapq.heappop(found)
+        if deadline is not None and time.perf_counter() >= deadline:
+            return
+        leg = cost[node][j]
+        if leg != math.inf:
+            heapq.heappush(found, (leg, j))
+    while found:
+        yield heapq.heappop(found)
+
+def greedy_tour(cost, estimate=None, deadline=None):
+    """
+    Return (length, order) of the nearest-feasible-neighbour tour from node 0,
+    backtracking when it reaches a node with no feasible leg onwards. Returns
+    (math.inf, None) if there is no feasible tour, or none was found before
+    the deadline.
+    """
+    n = len(cost)
+    if n <= 1:
+        return 0, []
+    estimate = estimate or cost
+
+    order = []
+    stack = [nearest_first(cost, estimate, 0, range(1, n), deadline)]
+    length = [0]
+    while stack:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        step = next(stack[-1], None)
+        if step is None:
+            # Dead end, undo the last move
+            stack.pop()
+            if order:
+                order.pop()
+                length.pop()
+            continue
+        leg, j = step
+        order.append(j)
+        length.append(length[-1] + leg)
+        if len(order) == n - 1:
+            return length[-1], order
+        remaining = [k for k in range(1, n) if k not in order]
+        stack.append(nearest_first(cost, estimate, j, remaining, deadline))
+
+    return math.inf, None
+
+def neighbours(order):
+    """
+    Yield the tours one 2-opt or Or-opt move away from order: every reversed
+    stretch, and every stretch of up to 3 nodes moved elsewhere, forwards or
+    reversed. The start node 0 stays in place.
+    """
+    n = len(order)
+    for i in range(n - 1):
+        for j in range(i + 1, n):
+            yield order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+
+    for size in range(1, min(3, n - 1) + 1):
+        for i in range(n - size + 1):
+            block = order[i:i + size]
+            rest = order[:i] + order[i + size:]
+            for k in range(len(rest) + 1):
+                if k == i:
+                    continue
+                yield rest[:k] + block + rest[k:]
+                if size > 1:
+                    yield rest[:k] + block[::-1] + rest[k:]
+
+def improve_tour(cost, order, estimate=None, deadline=None):
+    """
+    Local search from order with 2-opt and Or-opt moves, taking the first
+    improving move each time. Yields (length, order) for every improvement
+    until no move helps or the deadline passes. A move is only costed in full
+    when its estimated length beats the current tour.
+    """
+    estimate = estimate or cost
+    length = tour_length(cost, order)
+    improved = True
+    while improved:
+        improved = False
+        for candidate in neighbours(order):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if tour_length(estimate, candidate) >= length:
+                continue
+            candidate_length = tour_length(cost, candidate)
+            if candidate_length < length:
+                length, order = candidate_length, candidate
+                improved = True
+                yield length, order
+                break
+
+def anytime_tour(cost, budget=None, estimate=None, exact=True):
+    """
+    Yield (length, order) for successively shorter feasible tours from node 0:
+    the greedy nearest-feasible tour first, then each 2-opt/Or-opt improvement,
+    then, if time is left and exact is set, the optimum from branch_and_bound
+    seeded with the best length so far. Stops after budget seconds, so the
+    last tour yielded is the best plan found in time.
+
+    estimate is an optional matrix of lower bounds on cost; with a cost matrix
+    that is computed on demand (legs.LegMatrix.lazy_costs), it lets the search
+    skip legs that cannot be part of a better tour.
+    """
+    deadline = None if budget is None else time.perf_counter() + budget
+
+    length, order = greedy_tour(cost, estimate, deadline)
+    if order is None:
+        return
+    yield length, order
+
+    for length, order in improve_tour(cost, order, estimate, deadline):
+        yield length, order
+
+    if exact and (deadline is None or time.perf_counter() < deadline):
+        best_length, best_order = branch_and_bound(cost, length, deadline, estimate)
+        if best_order is not None and best_length < length:
+            yield best_length, best_order
+
+def solve_tour(cost, method='held_karp', budget=None, estimate=None):
+    """
+    Return (length, order) of the cheapest open tour from node 0 over the cost
+    matrix, using either 'held_karp' or 'branch_and_bound', or the best tour
+    'anytime' finds within budget seconds.
+    """
+    if method == 'held_karp':
+        return held_karp(cost)
+    elif method == 'branch_and_bound':
+        return branch_and_bound(cost, estimate=estimate)
+    elif method == 'anytime':
+        best = (math.inf, None)
+        for best in anytime_tour(cost, budget, estimate):
+            pass
+        return best
+    raise ValueError(f"Unknown tour method: {method}")
@@ -44,3 +44,8 @@ def deg2rad(deg):
 
 def sign(x):
     return 1 if x >= 0 else -1
+
+def percentile(values, p):
+    """ Nearest-rank percentile of a non-empty list. """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
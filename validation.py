@@ -0,0 +1,84 @@
+from params import ARENA_WIDTH, ARENA_HEIGHT, MIN_RADIUS
+from collision_index import BOUNDARY_PADDING, footprint_points, pillar_box
+from spatial_index import PillarGrid
+from kinematics import advance
+from packed_path import as_segments
+
+class Pose:
+    """
+    Immutable robot pose. 0 degrees is facing right, 90 degrees is facing up.
+    """
+    __slots__ = ('x', 'y', 'degrees')
+
+    def __init__(self, x, y, degrees):
+        object.__setattr__(self, 'x', x)
+        object.__setattr__(self, 'y', y)
+        object.__setattr__(self, 'degrees', degrees)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Pose is immutable")
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.degrees))
+
+    def __eq__(self, other):
+        return isinstance(other, Pose) and tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"Pose({self.x:.2f}, {self.y:.2f}, {self.degrees:.2f})"
+
+class PillarObstacles:
+    """
+    Exact footprint test against a list of pillars, giving the same verdicts
+    as Robot.collision_detected without a collision index. Read-only once
+    built, so it can be shared between threads.
+    """
+    def __init__(self, pillars):
+        self.pillars = list(pillars)
+        self.index = PillarGrid(self.pillars)
+
+    def footprint_blocked(self, x, y, degrees):
+        points = footprint_points(x, y, degrees)
+
+        # Check each point against the arena boundary
+        for px, py in points:
+            if (px < -BOUNDARY_PADDING or px > ARENA_WIDTH + BOUNDARY_PADDING or
+                    py < -BOUNDARY_PADDING or py > ARENA_HEIGHT + BOUNDARY_PADDING):
+                return True
+
+        # Check for pillar collisions, only with the pillars near the footprint
+        for pillar in self.index.query_points(points):
+            x_min, y_min, x_max, y_max = pillar_box(pillar)
+            for px, py in points:
+                if x_min < px < x_max and y_min < py < y_max:
+                    return True
+
+        return False
+
+# Fractions of each segment checked for collisions, like Robot.simulate_reeds_shepps_path
+CHECKPOINTS = (0.25, 0.5, 0.75, 1.0)
+
+def validate_path(pose, path, obstacles, r=MIN_RADIUS):
+    """
+    Drive path (a list of PathElement or a PackedPath) from pose, checking the
+    footprint at each segment's checkpoints against obstacles (anything with a
+    footprint_blocked(x, y, degrees) method, e.g. PillarObstacles, OccupancyGrid
+    or CSpaceTable).
+
+    Returns (ok, end_pose, first_collision_index): end_pose is the Pose reached
+    at the end of the path, and first_collision_index the index of the first
+    segment that collides, or None if ok. Has no side effects, so one obstacle
+    index can serve any number of threads or tasks at once.
+    """
+    x, y, degrees = pose
+    for index, (param, steering, gear) in enumerate(as_segments(path)):
+        for fraction in CHECKPOINTS:
+            cx, cy, cd = advance(x, y, degrees, steering, gear, param * fraction, r)
+            if obstacles.footprint_blocked(cx, cy, cd):
+                return False, None, index
+        x, y, degrees = cx, cy, cd
+
+    return True, Pose(x, y, degrees % 360), None